@@ -1,8 +1,17 @@
 # Flask web application for managing TikTok live stream monitoring and Discord notifications
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import json  # For reading/writing JSON files (user list)
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
+from flask_orjson import OrjsonProvider  # orjson-backed JSON provider (faster jsonify/request.json)
+import json  # For reading JSON files (user list)
+import orjson  # Fast JSON encoding when writing the user list
 import os  # For file system operations and environment variables
+import logging  # For configuring log output of the app and its services
+import logging.handlers  # QueueHandler/QueueListener - writes log output off the calling thread
+import queue  # Unbounded queue between the log handlers and the listener thread
+import atexit  # For flushing queued log records on exit
+import tempfile  # For a unique temp file per users file write
+import threading  # For serializing concurrent users file updates
 from datetime import datetime  # For timestamping when users are added
+from marshmallow import Schema, fields, validate, pre_load, ValidationError, EXCLUDE  # Request body validation
 from dotenv import load_dotenv  # For loading environment variables from .env file
 from monitoring_service import MonitoringService  # Background service that monitors TikTok streams
 from discord_webhook import DiscordWebhook  # Handles sending notifications to Discord
@@ -11,6 +20,51 @@ from discord_webhook import DiscordWebhook  # Handles sending notifications to D
 # This allows users to set DISCORD_WEBHOOK_URL and other config without hardcoding
 load_dotenv()
 
+# Configure logging once for the whole process
+# LOG_LEVEL defaults to WARNING so routine success messages are skipped; set LOG_LEVEL=DEBUG to see them
+# Loggers only put records on a queue; a listener thread does the formatting + stderr writes,
+# so the monitoring event loop never waits on the stream lock during gift storms
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves all formatting to the listener thread.
+    The stock prepare() merges the message and any traceback (log.exception) into the
+    record on the calling thread; here the record is queued as-is, so a burst of failing
+    event handlers doesn't format tracebacks on the event loop.
+    Only attached to this app's own loggers (see _DEFERRED_LOGGERS).
+    """
+
+    def prepare(self, record):
+        # Our log arguments are plain values (usernames, counts, exceptions), safe to format later
+        return record
+
+
+# This app's loggers, whose arguments are known to be safe to format later
+# Library loggers (werkzeug, aiohttp, TikTokLive) keep the stock QueueHandler on the root logger,
+# which snapshots the message before a library can mutate what it logged
+_DEFERRED_LOGGERS = ('monitoring_service', 'discord_webhook')
+
+
+_log_queue = queue.Queue(-1)
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+logging.basicConfig(
+    level=os.environ.get('LOG_LEVEL', 'WARNING').upper(),
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+_deferred_handler = _DeferredQueueHandler(_log_queue)
+for _name in _DEFERRED_LOGGERS:
+    _logger = logging.getLogger(_name)
+    _logger.addHandler(_deferred_handler)
+    # Their records already reach the queue - don't also pass them to the root handler
+    # (the level is still inherited from the root logger)
+    _logger.propagate = False
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+# Write out whatever is still queued when the process exits
+atexit.register(_log_listener.stop)
+
 # Get the directory where this script is located
 # This ensures the app works regardless of where it's run from
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -19,6 +73,8 @@ TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')  # Path to HTML templates fol
 # Initialize Flask app with explicit template folder
 # Flask needs to know where to find HTML templates
 app = Flask(__name__, template_folder=TEMPLATE_DIR)
+# Route jsonify() and request.json through orjson instead of the stdlib json module
+app.json = OrjsonProvider(app)
 # Secret key for Flask sessions (should be changed in production)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
@@ -26,86 +82,215 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-i
 monitoring_service = MonitoringService()  # Handles background monitoring of TikTok streams
 discord_webhook = DiscordWebhook()  # Handles Discord webhook notifications
 
+# Webhook URLs shown in the UI - read from the environment once here, then updated by /api/monitoring/start
+# (request handlers read this dict instead of going through os.environ on every request)
+_webhook_urls = {
+    'main': os.environ.get('DISCORD_WEBHOOK_URL', ''),  # Main webhook for live notifications
+    'gift': os.environ.get('DISCORD_GIFT_WEBHOOK_URL', ''),  # Optional separate webhook for gifts
+}
+
+# Request body schemas (instantiated once and shared across requests)
+class _StrippedSchema(Schema):
+    """Base schema: ignores unknown keys and strips surrounding whitespace from string values"""
+    class Meta:
+        unknown = EXCLUDE  # Silently drop fields we don't use instead of rejecting the request
+
+    @pre_load
+    def strip_strings(self, data, **kwargs):
+        # Non-dict bodies are left alone so marshmallow reports them as invalid input
+        if isinstance(data, dict):
+            return {key: value.strip() if isinstance(value, str) else value for key, value in data.items()}
+        return data
+
+class AddUserSchema(_StrippedSchema):
+    """POST /api/users body"""
+    username = fields.Str(required=True, validate=validate.Length(min=1, error='Username is required'),
+                          error_messages={'required': 'Username is required'})
+
+class StartMonitoringSchema(_StrippedSchema):
+    """POST /api/monitoring/start body"""
+    webhook_url = fields.Str(required=True, validate=validate.Length(min=1, error='Discord webhook URL is required'),
+                             error_messages={'required': 'Discord webhook URL is required'})  # Main webhook for live notifications
+    gift_webhook_url = fields.Str(load_default='')  # Optional separate webhook for gifts
+
+class TestWebhookSchema(_StrippedSchema):
+    """POST /api/webhook/test body"""
+    webhook_url = fields.Str(load_default='')  # Optional - falls back to the configured webhook
+
+_add_user_schema = AddUserSchema()
+_start_monitoring_schema = StartMonitoringSchema()
+_test_webhook_schema = TestWebhookSchema()
+
+@app.errorhandler(ValidationError)
+def handle_validation_error(error):
+    """Turn schema validation failures into a 400 with the first error message"""
+    # error.messages maps field name -> list of messages
+    messages = next(iter(error.messages.values()), ['Invalid request'])
+    message = messages[0] if isinstance(messages, list) else str(messages)
+    return jsonify({'error': message}), 400  # 400 = Bad Request
+
 # Data file for storing monitored users (JSON format)
 # This file persists the list of TikTok usernames to monitor
-USERS_FILE = 'monitored_users.json'
+# Anchored to BASE_DIR so it resolves to the same file no matter which directory the app is started from
+USERS_FILE = os.path.join(BASE_DIR, 'monitored_users.json')
+
+# In-process cache of the parsed users file, keyed by the file's modification time
+# Avoids re-reading and re-parsing the JSON file on every request when nothing changed
+# 'index' maps lowercased username -> user entry for O(1) case-insensitive lookups
+_users_cache = {'mtime': None, 'data': None, 'index': {}}
+
+def _index_users(users):
+    """Build the lowercase username -> user entry index for a list of users"""
+    return {u.get('username', '').lower(): u for u in users}
 
 def load_users():
-    """Load monitored users from JSON file"""
-    # Check if the users file exists before trying to read it
-    if os.path.exists(USERS_FILE):
-        # Open and read the JSON file
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)  # Parse JSON and return list of users
-    # Return empty list if file doesn't exist yet (first run)
-    return []
+    """Load monitored users from JSON file (cached until the file's mtime changes)"""
+    # A single stat() call tells us both whether the file exists and whether it changed
+    try:
+        mtime = os.stat(USERS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        # Drop any stale cache (file was deleted) so the index stays in sync
+        _users_cache.update(mtime=None, data=None, index={})
+        # Return empty list if file doesn't exist yet (first run)
+        return []
+    # Cache hit: file hasn't changed since we last parsed it
+    if _users_cache['mtime'] == mtime:
+        return list(_users_cache['data'])  # Shallow copy so callers can't mutate the cache
+    # Cache miss: open and parse the JSON file, then remember the result
+    with open(USERS_FILE, 'r') as f:
+        users = json.load(f)  # Parse JSON into list of users
+    _users_cache['data'] = users
+    _users_cache['index'] = _index_users(users)
+    _users_cache['mtime'] = mtime
+    return list(users)
+
+# Held across load -> modify -> save in the add/remove endpoints, so concurrent requests
+# (threaded=True / gthread workers) can't overwrite each other's changes
+_users_lock = threading.Lock()
 
 def save_users(users):
-    """Save monitored users to JSON file"""
-    # Write the users list to JSON file with pretty formatting (indent=2)
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)  # indent=2 makes the JSON readable
+    """Save monitored users to JSON file (atomic: temp file + rename)"""
+    # Write compact JSON to a temp file first so a crash mid-write never corrupts the real file
+    # The file is only read by this app, so pretty-printing isn't needed
+    # Each write gets its own temp file (same directory, so the rename stays atomic)
+    fd, tmp_file = tempfile.mkstemp(dir=BASE_DIR, prefix='monitored_users.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(orjson.dumps(users))
+        # mkstemp creates the file owner-only; keep the users file's usual permissions
+        os.chmod(tmp_file, 0o644)
+        # Atomically swap the temp file into place (readers see either the old or the new list)
+        os.replace(tmp_file, USERS_FILE)
+    except BaseException:
+        # Don't leave the temp file behind if the write or rename failed
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
+    # Refresh the cache immediately so the next load_users() doesn't re-parse what we just wrote
+    _users_cache['data'] = list(users)
+    _users_cache['index'] = _index_users(users)
+    _users_cache['mtime'] = os.stat(USERS_FILE).st_mtime_ns
+
+def _users_mtime():
+    """Return the users file's mtime in nanoseconds (0 if it doesn't exist yet)"""
+    try:
+        return os.stat(USERS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+def _etag_response(tag, make_body):
+    """
+    Build a JSON response tagged with a weak ETag.
+    If the client's If-None-Match already matches, reply 304 Not Modified without building the body.
+    
+    Args:
+        tag: ETag value identifying the current state of the data
+        make_body: Callable returning the data to jsonify (only called when the client is stale)
+    """
+    if request.if_none_match.contains_weak(tag):
+        # Client already has this version - skip loading and serializing entirely
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(make_body())
+    response.set_etag(tag, weak=True)
+    return response
+
+# Last rendered index page as a single (inputs, html) tuple so readers always see a matching pair
+# The page only depends on the users file and the webhook/monitoring state, so it is re-rendered
+# only when one of those changes instead of running Jinja on every page load
+_index_page = {'entry': (None, None)}
 
 @app.route('/')
 def index():
     """Main page with user management UI - renders the web interface"""
-    # Load the current list of monitored users from file
-    users = load_users()
-    # Get webhook URLs from environment variables (or empty string if not set)
-    webhook_url = os.environ.get('DISCORD_WEBHOOK_URL', '')  # Main webhook for live notifications
-    gift_webhook_url = os.environ.get('DISCORD_GIFT_WEBHOOK_URL', '')  # Optional separate webhook for gifts
+    # Get the current webhook URLs (or empty string if not set)
+    webhook_url = _webhook_urls['main']  # Main webhook for live notifications
+    gift_webhook_url = _webhook_urls['gift']  # Optional separate webhook for gifts
     # Check if the monitoring service is currently running
     is_monitoring = monitoring_service.is_running()
-    # Render the HTML template with all the data needed for the UI
-    return render_template('index.html', users=users, webhook_url=webhook_url, gift_webhook_url=gift_webhook_url, is_monitoring=is_monitoring)
+    # Everything the rendered page depends on
+    key = (_users_mtime(), webhook_url, gift_webhook_url, is_monitoring)
+    cached_key, html = _index_page['entry']
+    if cached_key != key:
+        # Load the current list of monitored users from file
+        users = load_users()
+        # Render the HTML template with all the data needed for the UI
+        html = render_template('index.html', users=users, webhook_url=webhook_url, gift_webhook_url=gift_webhook_url, is_monitoring=is_monitoring)
+        _index_page['entry'] = (key, html)
+    return Response(html, mimetype='text/html')
 
 @app.route('/api/users', methods=['GET'])
 def get_users():
     """API endpoint: Get list of monitored users (returns JSON)"""
     # Return the list of users as JSON for the frontend to consume
-    return jsonify(load_users())
+    # The ETag is the file's mtime, so unchanged polls get a 304 with no body
+    return _etag_response(str(_users_mtime()), load_users)
 
 @app.route('/api/users', methods=['POST'])
 def add_user():
     """API endpoint: Add a user to the monitored list"""
-    # Get the JSON data sent from the frontend
-    data = request.json
-    # Extract and clean the username (remove whitespace)
-    username = data.get('username', '').strip()
-    
-    # Validate that username was provided
-    if not username:
-        return jsonify({'error': 'Username is required'}), 400  # 400 = Bad Request
-    
-    # Load existing users from file
-    users = load_users()
+    # Get the JSON data sent from the frontend and validate it
+    # silent=True returns None for a missing/malformed body instead of raising (treated as empty)
+    # (username is required and already stripped of whitespace; errors become a 400)
+    data = _add_user_schema.load(request.get_json(silent=True, cache=True) or {})
+    username = data['username']
     
-    # Check if user already exists (case-insensitive comparison)
-    # Prevents duplicate entries in the monitoring list
-    if any(u.get('username', '').lower() == username.lower() for u in users):
-        return jsonify({'error': 'User already in list'}), 400
-    
-    # Add the new user with a timestamp
-    users.append({
-        'username': username,
-        'added_at': datetime.now().isoformat()  # ISO format timestamp (e.g., "2025-01-15T10:30:00")
-    })
-    
-    # Save the updated list back to file
-    save_users(users)
+    with _users_lock:
+        # Load existing users from file
+        users = load_users()
+        
+        # Check if user already exists (case-insensitive lookup in the cached index)
+        # Prevents duplicate entries in the monitoring list
+        if username.lower() in _users_cache['index']:
+            return jsonify({'error': 'User already in list'}), 400
+        
+        # Add the new user with a timestamp
+        users.append({
+            'username': username,
+            'added_at': datetime.now().isoformat()  # ISO format timestamp (e.g., "2025-01-15T10:30:00")
+        })
+        
+        # Save the updated list back to file
+        save_users(users)
     # Return success message and updated user list
     return jsonify({'message': 'User added successfully', 'users': users})
 
 @app.route('/api/users/<username>', methods=['DELETE'])
 def remove_user(username):
     """API endpoint: Remove a user from the monitored list"""
-    # Load current users from file
-    users = load_users()
-    # Filter out the user to remove (case-insensitive matching)
-    # List comprehension keeps all users EXCEPT the one matching the username
-    users = [u for u in users if u.get('username', '').lower() != username.lower()]
-    # Save the updated list (without the removed user)
-    save_users(users)
+    with _users_lock:
+        # Load current users from file
+        users = load_users()
+        # Case-insensitive lookup in the cached index - only rewrite the file if something matches
+        key = username.lower()
+        if key in _users_cache['index']:
+            # List comprehension keeps all users EXCEPT those matching (the file may hold
+            # several entries differing only in case, and the index keeps just one of them)
+            users = [u for u in users if u.get('username', '').lower() != key]
+            # Save the updated list (without the removed user)
+            save_users(users)
     # Return success message and updated user list
     return jsonify({'message': 'User removed successfully', 'users': users})
 
@@ -113,14 +298,17 @@ def remove_user(username):
 def start_monitoring():
     """API endpoint: Start the monitoring service"""
     # Get webhook URLs from the request (user entered in UI)
-    webhook_url = request.json.get('webhook_url', '').strip()  # Main webhook for live notifications
-    gift_webhook_url = request.json.get('gift_webhook_url', '').strip()  # Optional separate webhook for gifts
-    
-    # Validate that at least the main webhook URL is provided
-    if not webhook_url:
-        return jsonify({'error': 'Discord webhook URL is required'}), 400
+    # The schema requires the main webhook URL and strips whitespace; errors become a 400
+    # silent=True returns None for a missing/malformed body instead of raising (treated as empty)
+    data = _start_monitoring_schema.load(request.get_json(silent=True, cache=True) or {})
+    webhook_url = data['webhook_url']  # Main webhook for live notifications
+    gift_webhook_url = data['gift_webhook_url']  # Optional separate webhook for gifts
     
-    # Store webhook URLs in environment variables so other parts of the app can access them
+    # Remember the URLs for the UI
+    _webhook_urls['main'] = webhook_url
+    _webhook_urls['gift'] = gift_webhook_url
+    # Also store them in environment variables, so DiscordWebhook()'s environment fallback
+    # (and a cleared gift URL) match what the user entered
     os.environ['DISCORD_WEBHOOK_URL'] = webhook_url
     if gift_webhook_url:
         # If gift webhook is provided, store it
@@ -147,8 +335,10 @@ def stop_monitoring():
 def monitoring_status():
     """API endpoint: Get monitoring service status"""
     # Return current status information for the frontend
-    return jsonify({
-        'is_running': monitoring_service.is_running(),  # True if monitoring is active
+    # The ETag combines the users file's mtime and the running flag (everything the body depends on)
+    is_running = monitoring_service.is_running()
+    return _etag_response(f'{_users_mtime()}-{int(is_running)}', lambda: {
+        'is_running': is_running,  # True if monitoring is active
         'users_count': len(load_users())  # Number of users being monitored
     })
 
@@ -156,10 +346,11 @@ def monitoring_status():
 def test_webhook():
     """API endpoint: Test the Discord webhook by sending a test message"""
     # Get webhook URL from request, or try to find it from environment/service
-    webhook_url = request.json.get('webhook_url', '').strip()
+    # silent=True returns None for a missing/malformed body instead of raising (treated as empty)
+    webhook_url = _test_webhook_schema.load(request.get_json(silent=True, cache=True) or {})['webhook_url']
     if not webhook_url:
-        # Fallback: try to get from environment variable or monitoring service
-        webhook_url = os.environ.get('DISCORD_WEBHOOK_URL', '') or getattr(monitoring_service, '_webhook_url', None)
+        # Fallback: use the current webhook URL or the monitoring service's
+        webhook_url = _webhook_urls['main'] or getattr(monitoring_service, '_webhook_url', None)
     
     # Validate that we have a webhook URL
     if not webhook_url:
@@ -188,10 +379,16 @@ def test_webhook():
         return jsonify({'error': f'Error sending test notification: {str(e)}'}), 500
 
 # Main entry point - only runs when script is executed directly (not imported)
+# For production, run under a WSGI server instead (app:app is the WSGI entry point), e.g.:
+#   gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:5000 app:app
+# Keep a single worker process: the monitoring service lives in-process, so extra workers
+# would each get their own (unstarted) copy - use threads for request concurrency instead
 if __name__ == '__main__':
-    # Start the Flask development server
-    # debug=True enables auto-reload on code changes and detailed error pages
+    # Debug mode (auto-reload on code changes + detailed error pages) only when FLASK_DEV is set
+    # The reloader stat()s every source file and runs the app in a second process, so keep it off otherwise
+    dev_mode = bool(os.environ.get('FLASK_DEV'))
     # host='0.0.0.0' makes the server accessible from any network interface
     # port=5000 is the default Flask port
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # threaded=True handles requests concurrently instead of one at a time
+    app.run(debug=dev_mode, use_reloader=dev_mode, threaded=True, host='0.0.0.0', port=5000)
 
@@ -1,8 +1,14 @@
 # Discord webhook integration for sending notifications to Discord channels
 import os  # For accessing environment variables
+import logging  # For reporting send results (configured by the application)
+import asyncio  # For retry back-off in the async send path
+import aiohttp  # For async HTTP POSTs from the monitoring event loop
 import requests  # For making HTTP POST requests to Discord webhook URLs
+from requests.adapters import HTTPAdapter  # Connection pooling for the shared session
+from urllib3.util.retry import Retry  # Automatic retries for rate limits / server errors
 from datetime import datetime  # For timestamping notifications
 import random  # For generating random colors for embeds
+import orjson  # Fast JSON serialization for webhook payloads
 try:
     from zoneinfo import ZoneInfo  # Python 3.9+ timezone support
     HAS_ZONEINFO = True
@@ -11,95 +17,286 @@ except ImportError:
     import pytz
     HAS_ZONEINFO = False
 
+# Module logger - success messages are DEBUG so they cost a single level check in production
+log = logging.getLogger(__name__)
+
+# Eastern Time zone object, built once (America/New_York handles EST/EDT automatically)
+_EASTERN_TZ = ZoneInfo('America/New_York') if HAS_ZONEINFO else pytz.timezone('America/New_York')
+
+# Precompiled URL/text builders and constants shared by every embed
+# Bound str.format methods avoid re-parsing f-string templates for the same URL several times per embed
+_PROFILE_URL = 'https://www.tiktok.com/@{}'.format  # TikTok profile page
+_LIVE_URL = 'https://www.tiktok.com/@{}/live'.format  # TikTok live stream page
+_FOOTER_TEXT = 'Discord TikTok Notifier • {:%Y-%m-%d %H:%M:%S}'.format  # Footer text with timestamp
+_TIKTOK_ICON = 'https://www.tiktok.com/favicon.ico'  # TikTok icon used for author/footer/thumbnail
+# Fully static embed parts, shared (embeds are only serialized, never mutated)
+_STREAM_ENDED_FIELD = {'name': '📊 Status', 'value': 'Stream Ended', 'inline': True}
+_TIKTOK_THUMBNAIL = {'url': _TIKTOK_ICON}  # Default thumbnail (TikTok icon)
+
+# Retry policy shared by the sync and async send paths:
+# rate limits (429) and transient server errors are retried up to 3 times with exponential back-off
+_RETRY_TOTAL = 3
+_RETRY_BACKOFF = 0.3
+_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Request headers for the pre-serialized JSON payloads
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Shared HTTP session for all synchronous webhook posts (e.g. the test endpoint in app.py)
+# Every webhook lives on discord.com, so keeping the connection alive skips the
+# DNS lookup + TCP + TLS handshake on every notification after the first one
+_session = requests.Session()
+# urllib3 honours Discord's Retry-After header
+# raise_on_status=False returns the final response so send() can report the error normally
+_retry = Retry(
+    total=_RETRY_TOTAL,
+    backoff_factor=_RETRY_BACKOFF,
+    status_forcelist=sorted(_RETRY_STATUSES),
+    allowed_methods=['POST'],
+    raise_on_status=False
+)
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=_retry))
+
+# Total timeout for async webhook posts (same as the sync path)
+_AIO_TIMEOUT = aiohttp.ClientTimeout(total=10)
+# Connection pool settings for each webhook's async session (created lazily on its event loop)
+_AIO_CONNECTOR_ARGS = {'limit': 100, 'ttl_dns_cache': 300, 'keepalive_timeout': 75}
+
+# Discord accepts at most 10 embeds in a single webhook message
+MAX_EMBEDS_PER_MESSAGE = 10
+
 class DiscordWebhook:
     """
     Handles sending formatted notifications to Discord via webhooks.
     Supports separate webhooks for live notifications and gift notifications.
     """
     def __init__(self, webhook_url=None, gift_webhook_url=None):
+        self.set_urls(webhook_url, gift_webhook_url)
+        # aiohttp session for the async send path (created on first use, see _get_session)
+        self._aio_session = None
+    
+    def set_urls(self, webhook_url=None, gift_webhook_url=None):
+        """
+        Set the webhook URLs (lets a long-lived instance follow configuration changes).
+        
+        Args:
+            webhook_url: Main webhook URL for live stream notifications
+            gift_webhook_url: Optional separate webhook URL for gift notifications
+        """
         # Get webhook URL from parameter, or fall back to environment variable
         # Main webhook URL for live stream notifications
         self.webhook_url = webhook_url or os.environ.get('DISCORD_WEBHOOK_URL', '')
         # Optional separate webhook URL for gift notifications (can be different channel)
         self.gift_webhook_url = gift_webhook_url or os.environ.get('DISCORD_GIFT_WEBHOOK_URL', '')
     
+    def _get_session(self):
+        """
+        Get the aiohttp session for async sends, creating it on first use.
+        Must be called from the event loop the session should belong to; one session
+        pools keep-alive connections to Discord across every async send.
+        """
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(**_AIO_CONNECTOR_ARGS))
+        return self._aio_session
+    
+    async def close(self):
+        """Close the async session (call on its event loop before the loop stops)"""
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+    
     def _generate_random_color(self):
         """
         Generate a random color for Discord embeds.
         Returns a random hex color value (0x000000 to 0xFFFFFF).
         """
-        # Generate random RGB values and convert to hex
-        # Using vibrant colors (avoiding too dark/light colors for better visibility)
-        r = random.randint(50, 255)  # Red component (50-255 for vibrancy)
-        g = random.randint(50, 255)  # Green component (50-255 for vibrancy)
-        b = random.randint(50, 255)  # Blue component (50-255 for vibrancy)
-        # Convert RGB to hex color format (0xRRGGBB)
-        return (r << 16) | (g << 8) | b
+        # Generate all 24 bits (0xRRGGBB) with a single RNG call
+        # OR-ing in 0x32 per channel keeps every component >= 50 (avoids too-dark colors)
+        return random.getrandbits(24) | 0x323232
     
     def _get_eastern_time(self):
         """
         Get the current time in Eastern Time (handles EST/EDT automatically).
         Returns a timezone-aware datetime object in Eastern Time.
         """
-        # Get current time in Eastern Time (America/New_York handles DST automatically)
-        if HAS_ZONEINFO:
-            # Python 3.9+ with zoneinfo
-            eastern_tz = ZoneInfo('America/New_York')
-            return datetime.now(eastern_tz)
-        else:
-            # Fallback for pytz (Python < 3.9)
-            eastern_tz = pytz.timezone('America/New_York')
-            return datetime.now(eastern_tz)
+        # Uses the module-level zone object instead of constructing a new one per call
+        return datetime.now(_EASTERN_TZ)
     
-    def send(self, embed, mention_everyone=False):
+    def send(self, embed, mention_everyone=False, webhook_url=None):
         """
         Send an embed message to Discord webhook.
         
         Args:
             embed: Dictionary containing Discord embed data (title, description, color, etc.)
             mention_everyone: If True, adds @everyone mention to the message
+            webhook_url: Optional webhook URL to send to instead of self.webhook_url
         
         Returns:
             True if sent successfully, False otherwise
         """
+        return self.send_many([embed], mention_everyone=mention_everyone, webhook_url=webhook_url)
+    
+    def _payloads(self, embeds, mention_everyone):
+        """
+        Split embeds into webhook payloads of up to 10 embeds each.
+        
+        Args:
+            embeds: List of Discord embed dictionaries
+            mention_everyone: If True, adds a single @everyone mention (on the first message only)
+        
+        Returns:
+            Generator of payload dictionaries
+        """
+        for start in range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE):
+            # Build the payload for Discord webhook API
+            # Discord webhooks accept JSON with 'embeds' array (max 10 per message)
+            payload = {
+                'embeds': embeds[start:start + MAX_EMBEDS_PER_MESSAGE]
+            }
+            
+            # Add @everyone mention if requested (pings everyone in the channel)
+            # Only the first message carries the mention so a batch never pings more than once
+            if mention_everyone and start == 0:
+                payload['content'] = '@everyone'
+            yield payload
+    
+    def send_many(self, embeds, mention_everyone=False, webhook_url=None):
+        """
+        Send several embeds to Discord webhook, packing up to 10 embeds into each POST.
+        
+        Args:
+            embeds: List of Discord embed dictionaries
+            mention_everyone: If True, adds a single @everyone mention (on the first message only)
+            webhook_url: Optional webhook URL to send to instead of self.webhook_url
+        
+        Returns:
+            True if every message was sent successfully, False otherwise
+        """
+        # Use the explicit URL if given (e.g. gift webhook), otherwise the main webhook URL
+        # Passing the URL as an argument avoids mutating shared state between concurrent sends
+        url = webhook_url or self.webhook_url
+        
         # Validate that webhook URL is configured
-        if not self.webhook_url:
-            print("Warning: Discord webhook URL not configured")
+        if not url:
+            log.warning("Discord webhook URL not configured")
             return False
         
-        # Build the payload for Discord webhook API
-        # Discord webhooks accept JSON with 'embeds' array
-        payload = {
-            'embeds': [embed]  # Discord expects an array of embed objects
-        }
-        
-        # Add @everyone mention if requested (pings everyone in the channel)
-        if mention_everyone:
-            payload['content'] = '@everyone'
+        success = True
+        for payload in self._payloads(embeds, mention_everyone):
+            success = self._post(url, payload) and success
+        return success
+    
+    def _post(self, url, payload):
+        """
+        POST a single webhook payload to Discord.
         
+        Returns:
+            True if sent successfully, False otherwise
+        """
         try:
             # Send POST request to Discord webhook URL
+            # Payload is pre-serialized with orjson (much faster than requests' stdlib json)
+            # Uses the shared keep-alive session (see _session above)
             # timeout=10 prevents hanging if Discord is unreachable
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
-            # Raise exception if HTTP status code indicates error (4xx, 5xx)
-            response.raise_for_status()
-            print(f"✅ Discord webhook sent successfully (status: {response.status_code})")
+            response = _session.post(
+                url,
+                data=orjson.dumps(payload),
+                headers=_JSON_HEADERS,
+                timeout=10
+            )
+            # Check the status code directly (cheaper than raising and catching HTTPError)
+            if response.status_code >= 400:
+                # HTTP error (e.g., 404 webhook not found, 401 unauthorized, 429 rate limited)
+                log.warning("❌ HTTP Error sending Discord webhook: %s (response: %s)",
+                            response.status_code, response.text[:200])
+                return False
+            log.debug("✅ Discord webhook sent successfully (status: %s)", response.status_code)
             return True
-        except requests.exceptions.HTTPError as e:
-            # HTTP error (e.g., 404 webhook not found, 401 unauthorized)
-            print(f"❌ HTTP Error sending Discord webhook: {e}")
-            print(f"   Response: {e.response.text if hasattr(e, 'response') else 'N/A'}")
-            return False
         except requests.exceptions.RequestException as e:
             # Network error (connection failed, timeout, etc.)
-            print(f"❌ Request Error sending Discord webhook: {e}")
+            log.error("❌ Request Error sending Discord webhook: %s", e)
             return False
         except Exception as e:
             # Catch any other unexpected errors
-            print(f"❌ Unexpected error sending Discord webhook: {e}")
+            log.error("❌ Unexpected error sending Discord webhook: %s", e)
             return False
     
-    def send_go_live_notification(self, username, viewer_count=0, stream_url="", is_host=False, title=""):
+    async def send_async(self, embed, mention_everyone=False, webhook_url=None):
+        """
+        Send an embed message to Discord webhook without blocking the event loop.
+        Same as send(), but posts through this webhook's aiohttp session.
+        
+        Args:
+            embed: Dictionary containing Discord embed data
+            mention_everyone: If True, adds @everyone mention to the message
+            webhook_url: Optional webhook URL to send to instead of self.webhook_url
+        
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        return await self.send_many_async([embed], mention_everyone=mention_everyone, webhook_url=webhook_url)
+    
+    async def send_many_async(self, embeds, mention_everyone=False, webhook_url=None):
+        """
+        Async version of send_many() - packs up to 10 embeds into each POST.
+        
+        Args:
+            embeds: List of Discord embed dictionaries
+            mention_everyone: If True, adds a single @everyone mention (on the first message only)
+            webhook_url: Optional webhook URL to send to instead of self.webhook_url
+        
+        Returns:
+            True if every message was sent successfully, False otherwise
+        """
+        url = webhook_url or self.webhook_url
+        
+        # Validate that webhook URL is configured
+        if not url:
+            log.warning("Discord webhook URL not configured")
+            return False
+        
+        session = self._get_session()
+        success = True
+        for payload in self._payloads(embeds, mention_everyone):
+            success = await self._post_async(session, url, payload) and success
+        return success
+    
+    async def _post_async(self, session, url, payload):
+        """
+        POST a single webhook payload to Discord via aiohttp, retrying rate limits and server errors.
+        
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        data = orjson.dumps(payload)
+        try:
+            for attempt in range(_RETRY_TOTAL + 1):
+                async with session.post(url, data=data, headers=_JSON_HEADERS, timeout=_AIO_TIMEOUT) as response:
+                    status = response.status
+                    if status in _RETRY_STATUSES and attempt < _RETRY_TOTAL:
+                        # Honour Discord's Retry-After (seconds), else back off exponentially
+                        try:
+                            delay = float(response.headers['Retry-After'])
+                        except (KeyError, ValueError):
+                            delay = _RETRY_BACKOFF * (2 ** attempt)
+                    elif status >= 400:
+                        # HTTP error (e.g., 404 webhook not found, 401 unauthorized, 429 rate limited)
+                        text = await response.text()
+                        log.warning("❌ HTTP Error sending Discord webhook: %s (response: %s)", status, text[:200])
+                        return False
+                    else:
+                        log.debug("✅ Discord webhook sent successfully (status: %s)", status)
+                        return True
+                # Sleep outside the response context so the connection goes back to the pool
+                await asyncio.sleep(delay)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Network error (connection failed, timeout, etc.)
+            log.error("❌ Request Error sending Discord webhook: %s", e)
+        except Exception as e:
+            # Catch any other unexpected errors
+            log.error("❌ Unexpected error sending Discord webhook: %s", e)
+        return False
+    
+    def send_go_live_notification(self, username, viewer_count=0, stream_url="", is_host=False, title="", profile_image_url=''):
         """
         Send notification when a user goes live on TikTok.
         
@@ -109,12 +306,26 @@ class DiscordWebhook:
             stream_url: Direct URL to the live stream (optional)
             is_host: If True, marks this user as the HOST (first to go live)
             title: Optional stream title/description
+            profile_image_url: Optional profile image URL to display in embed
         
         Returns:
             True if sent successfully, False otherwise
         """
+        embed = self.build_go_live_embed(username, viewer_count, stream_url, is_host, title, profile_image_url)
+        # Send the embed with @everyone mention to alert all users
+        return self.send(embed, mention_everyone=True)
+    
+    def build_go_live_embed(self, username, viewer_count=0, stream_url="", is_host=False, title="", profile_image_url=''):
+        """
+        Build the Discord embed for a go live notification (see send_go_live_notification).
+        
+        Returns:
+            Dictionary containing the Discord embed data
+        """
         # Generate a random vibrant color for this notification
         random_color = self._generate_random_color()
+        # Capture the current time once and reuse it for footer and timestamp
+        now = self._get_eastern_time()
         
         # Build the notification description
         description = f'**{username}** is now streaming live on TikTok!'
@@ -138,8 +349,11 @@ class DiscordWebhook:
                 'inline': True  # Display inline (side by side if space allows)
             })
         
+        # Build the profile and stream URLs once and reuse them below
+        profile_url = _PROFILE_URL(username)
+        stream_link = stream_url or _LIVE_URL(username)
+        
         # Add stream link as a field
-        stream_link = stream_url or f'https://www.tiktok.com/@{username}/live'
         fields.append({
             'name': '🔗 Stream Link',
             'value': f'[Watch Live]({stream_link})',  # Clickable link in Discord
@@ -149,7 +363,7 @@ class DiscordWebhook:
         # Add profile link
         fields.append({
             'name': '👤 Profile',
-            'value': f'[@{username}](https://www.tiktok.com/@{username})',
+            'value': f'[@{username}]({profile_url})',
             'inline': True
         })
         
@@ -161,22 +375,23 @@ class DiscordWebhook:
             'color': random_color,  # Random vibrant color for each notification
             'author': {
                 'name': f'@{username}',
-                'url': f'https://www.tiktok.com/@{username}',
-                'icon_url': 'https://www.tiktok.com/favicon.ico'  # TikTok icon
+                'url': profile_url,
+                'icon_url': _TIKTOK_ICON  # TikTok icon
             },
             'fields': fields,  # Additional structured information
-            'thumbnail': {
-                'url': f'https://www.tiktok.com/api/img/?itemId={username}'  # Profile thumbnail (if available)
-            },
             'footer': {
-                'text': f'Discord TikTok Notifier • {self._get_eastern_time().strftime("%Y-%m-%d %H:%M:%S")}',
-                'icon_url': 'https://www.tiktok.com/favicon.ico'
+                'text': _FOOTER_TEXT(now),
+                'icon_url': _TIKTOK_ICON
             },
-            'timestamp': self._get_eastern_time().isoformat()  # ISO timestamp in Eastern Time for Discord's time display
+            'timestamp': now.isoformat()  # ISO timestamp in Eastern Time for Discord's time display
         }
         
-        # Send the embed with @everyone mention to alert all users
-        return self.send(embed, mention_everyone=True)
+        # Only add a thumbnail when we have a real profile image URL
+        # (a guessed URL that 404s still costs Discord's image proxy a fetch per embed)
+        if profile_image_url:
+            embed['thumbnail'] = {'url': profile_image_url}
+        
+        return embed
     
     def send_end_live_notification(self, username, profile_image_url=''):
         """
@@ -189,24 +404,36 @@ class DiscordWebhook:
         Returns:
             True if sent successfully, False otherwise
         """
+        embed = self.build_end_live_embed(username, profile_image_url)
+        # Send with @everyone mention to notify users
+        return self.send(embed, mention_everyone=True)
+    
+    def build_end_live_embed(self, username, profile_image_url=''):
+        """
+        Build the Discord embed for an end live notification (see send_end_live_notification).
+        
+        Returns:
+            Dictionary containing the Discord embed data
+        """
         # Generate a random color for this notification (different from go-live)
         random_color = self._generate_random_color()
+        # Capture the current time once and reuse it for fields, footer and timestamp
+        now = self._get_eastern_time()
+        
+        # Build the profile URL once and reuse it below
+        profile_url = _PROFILE_URL(username)
         
         # Build fields array for additional information
         fields = [
-            {
-                'name': '📊 Status',
-                'value': 'Stream Ended',
-                'inline': True
-            },
+            _STREAM_ENDED_FIELD,
             {
                 'name': '👤 Profile',
-                'value': f'[@{username}](https://www.tiktok.com/@{username})',
+                'value': f'[@{username}]({profile_url})',
                 'inline': True
             },
             {
                 'name': '⏰ Ended At',
-                'value': self._get_eastern_time().strftime('%H:%M:%S'),
+                'value': now.strftime('%H:%M:%S'),
                 'inline': True
             }
         ]
@@ -215,48 +442,38 @@ class DiscordWebhook:
         embed = {
             'title': f'⚫ {username} ended their TikTok live stream',  # Notification title
             'description': f'**{username}** has ended their live stream on TikTok.',  # Description text
-            'url': f'https://www.tiktok.com/@{username}',  # Clickable link to profile
+            'url': profile_url,  # Clickable link to profile
             'color': random_color,  # Random color for each notification
             'author': {
                 'name': f'@{username}',
-                'url': f'https://www.tiktok.com/@{username}',
-                'icon_url': 'https://www.tiktok.com/favicon.ico'
+                'url': profile_url,
+                'icon_url': _TIKTOK_ICON
             },
             'fields': fields,  # Additional structured information
             'footer': {
-                'text': f'Discord TikTok Notifier • {self._get_eastern_time().strftime("%Y-%m-%d %H:%M:%S")}',
-                'icon_url': 'https://www.tiktok.com/favicon.ico'
+                'text': _FOOTER_TEXT(now),
+                'icon_url': _TIKTOK_ICON
             },
-            'timestamp': self._get_eastern_time().isoformat()  # ISO timestamp in Eastern Time
+            'timestamp': now.isoformat()  # ISO timestamp in Eastern Time
         }
         
         # Add profile image thumbnail if URL is provided
-        if profile_image_url:
-            embed['thumbnail'] = {'url': profile_image_url}
-        else:
-            # Use default TikTok icon if no profile image
-            embed['thumbnail'] = {
-                'url': 'https://www.tiktok.com/favicon.ico'
-            }
+        # Use default TikTok icon if no profile image
+        embed['thumbnail'] = {'url': profile_image_url} if profile_image_url else _TIKTOK_THUMBNAIL
         
-        # Send with @everyone mention to notify users
-        return self.send(embed, mention_everyone=True)
+        return embed
     
-    def send_gift_notification(self, username, gift_type, gift_amount, gifter_username=''):
+    def build_gift_embed(self, username, gift_type, gift_amount, gifter_username=''):
         """
-        Send notification when a user receives a gift on TikTok during a live stream.
-        
-        Args:
-            username: TikTok username of the streamer who received the gift
-            gift_type: Type/name of the gift (e.g., "Rose", "Heart")
-            gift_amount: Number of gifts received
-            gifter_username: Optional username of the person who sent the gift
+        Build the Discord embed for a gift notification (see send_gift_notification).
         
         Returns:
-            True if sent successfully, False otherwise
+            Dictionary containing the Discord embed data
         """
         # Generate a random vibrant color for this gift notification
         random_color = self._generate_random_color()
+        # Capture the current time once and reuse it for footer and timestamp
+        now = self._get_eastern_time()
         
         # Build description with gift details - show gift name if available
         if gift_type and gift_type != 'Gift':
@@ -266,6 +483,10 @@ class DiscordWebhook:
             # Generic gift (name not available)
             description = f'**{username}** received a gift during their live stream!'
         
+        # Build the profile and stream URLs once and reuse them below
+        profile_url = _PROFILE_URL(username)
+        live_url = _LIVE_URL(username)
+        
         # Build fields array for structured gift information
         fields = [
             {
@@ -284,58 +505,63 @@ class DiscordWebhook:
         if gifter_username:
             fields.append({
                 'name': '👤 From',
-                'value': f'[@{gifter_username}](https://www.tiktok.com/@{gifter_username})',
+                'value': f'[@{gifter_username}]({_PROFILE_URL(gifter_username)})',
                 'inline': True
             })
         
         # Add streamer profile link
         fields.append({
             'name': '📺 Streamer',
-            'value': f'[@{username}](https://www.tiktok.com/@{username})',
+            'value': f'[@{username}]({profile_url})',
             'inline': True
         })
         
         # Add live stream link
         fields.append({
             'name': '🔴 Watch Live',
-            'value': f'[Join Stream](https://www.tiktok.com/@{username}/live)',
+            'value': f'[Join Stream]({live_url})',
             'inline': True
         })
         
         # Create robust Discord embed for gift notification
         embed = {
-            'title': f'🎁 Gift Received on TikTok!',  # Notification title
+            'title': '🎁 Gift Received on TikTok!',  # Notification title
             'description': description,  # Gift details
-            'url': f'https://www.tiktok.com/@{username}/live',  # Clickable link to live stream
+            'url': live_url,  # Clickable link to live stream
             'color': random_color,  # Random vibrant color for each notification
             'author': {
                 'name': f'@{username}',
-                'url': f'https://www.tiktok.com/@{username}',
-                'icon_url': 'https://www.tiktok.com/favicon.ico'
+                'url': profile_url,
+                'icon_url': _TIKTOK_ICON
             },
             'fields': fields,  # Structured gift information
-            'thumbnail': {
-                'url': 'https://www.tiktok.com/favicon.ico'  # Gift icon placeholder
-            },
+            'thumbnail': _TIKTOK_THUMBNAIL,  # Gift icon placeholder
             'footer': {
-                'text': f'Discord TikTok Notifier • {self._get_eastern_time().strftime("%Y-%m-%d %H:%M:%S")}',
-                'icon_url': 'https://www.tiktok.com/favicon.ico'
+                'text': _FOOTER_TEXT(now),
+                'icon_url': _TIKTOK_ICON
             },
-            'timestamp': self._get_eastern_time().isoformat()  # ISO timestamp in Eastern Time
+            'timestamp': now.isoformat()  # ISO timestamp in Eastern Time
         }
         
-        # Use gift webhook URL if available (allows sending gifts to different channel)
-        # Otherwise fall back to main webhook URL
-        original_webhook_url = self.webhook_url  # Save current webhook URL
-        if self.gift_webhook_url:
-            # Temporarily switch to gift webhook URL
-            self.webhook_url = self.gift_webhook_url
+        return embed
+    
+    def send_gift_notification(self, username, gift_type, gift_amount, gifter_username=''):
+        """
+        Send notification when a user receives a gift on TikTok during a live stream.
         
-        # Send notification (without @everyone mention - gifts are less urgent)
-        result = self.send(embed, mention_everyone=False)
+        Args:
+            username: TikTok username of the streamer who received the gift
+            gift_type: Type/name of the gift (e.g., "Rose", "Heart")
+            gift_amount: Number of gifts received
+            gifter_username: Optional username of the person who sent the gift
         
-        # Restore original webhook URL so future live notifications go to main webhook
-        self.webhook_url = original_webhook_url
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        # Build the gift embed
+        embed = self.build_gift_embed(username, gift_type, gift_amount, gifter_username)
         
-        return result
-
+        # Use gift webhook URL if available (allows sending gifts to different channel)
+        # Otherwise fall back to main webhook URL
+        # Send notification (without @everyone mention - gifts are less urgent)
+        return self.send(embed, mention_everyone=False, webhook_url=self.gift_webhook_url or self.webhook_url)
@@ -1,9 +1,12 @@
 # Background monitoring service that watches TikTok live streams and sends Discord notifications
 import os  # For environment variables and file operations
+import sys  # For platform checks
+import logging  # For status/error output (configured by the application)
 import json  # For reading/writing user list JSON file
-import time  # For tracking connection durations and cooldowns
-import requests  # For checking TikTok live status via HTTP
-from apscheduler.schedulers.background import BackgroundScheduler  # For scheduled background tasks
+import time  # For tracking connection times, durations and cooldowns (monotonic clock)
+from operator import attrgetter  # For fast gift attribute access (resolved once per TikTokLive version)
+from functools import partial  # For binding per-notification completion callbacks
+import aiohttp  # For checking TikTok live status via HTTP (async, connection-pooled)
 from datetime import datetime  # For timestamps
 from dotenv import load_dotenv  # For loading .env file
 from discord_webhook import DiscordWebhook  # For sending Discord notifications
@@ -11,10 +14,130 @@ from TikTokLive import TikTokLiveClient  # Library for connecting to TikTok live
 from TikTokLive.events import ConnectEvent, DisconnectEvent, GiftEvent  # TikTokLive event types
 import asyncio  # For async/await operations (TikTokLive uses async)
 import threading  # For running async event loop in separate thread
+# Optional uvloop - a faster drop-in event loop (not available on Windows)
+try:
+    if sys.platform == 'win32':
+        raise ImportError("uvloop does not support Windows")
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    # Fall back to the standard asyncio event loop
+    HAS_UVLOOP = False
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Module logger - per-event chatter is INFO/DEBUG so it's skipped (unformatted) at the default WARNING level
+log = logging.getLogger(__name__)
+
+
+def _debug_timestamp():
+    """
+    ISO timestamp for the informational last_checked field.
+    Only built when DEBUG logging is enabled - nothing reads it otherwise.
+    """
+    return datetime.now().isoformat() if log.isEnabledFor(logging.DEBUG) else None
+
+# Data file with the monitored users (shared with app.py)
+# Anchored to this file's directory so it doesn't depend on the current working directory
+USERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitored_users.json')
+
+# Seconds between check_users runs
+CHECK_INTERVAL = 30
+
+# Seconds to wait after a disconnect before sending the end notification
+# Longer than CHECK_INTERVAL, so a user who is still live gets reconnected (cancelling it) first
+END_NOTIFICATION_GRACE = 45
+
+# TikTok request constants, built once instead of per request
+# Browser User-Agent for TikTok requests (some sites block requests without it)
+_UA_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+# Range header for the GET fallback when HEAD isn't allowed (fetch just the first byte)
+_RANGE_FIRST_BYTE = {'Range': 'bytes=0-0'}
+# TikTok live stream page for a username
+_LIVE_URL_TMPL = 'https://www.tiktok.com/@{}/live'
+
+# Maximum number of TikTok probes/TikTokLive handshakes in flight at once
+MAX_CONCURRENT_CONNECTS = 8
+
+# Seconds to collect gift events before sending them (same user + gift within the window are summed up)
+GIFT_FLUSH_WINDOW = 2
+
+# Discord notification queue: handlers enqueue, a single worker sends
+# Spacing between sends keeps us at ~5 requests/second (Discord's webhook rate limit)
+NOTIFY_INTERVAL = 0.2
+# Maximum queued notifications (anything queued while it's full is dropped and reported as a failed send)
+NOTIFY_QUEUE_SIZE = 1024
+
+# Attribute names TikTokLive has used for the gift name / repeat count across versions (first match wins)
+_GIFT_NAME_ATTRS = ('name', 'gift_name', 'giftName', 'giftId', 'gift_id')
+_GIFT_COUNT_ATTRS = ('repeat_count', 'repeatCount', 'count', 'amount')
+# Candidate attribute names for the gifter's username, in order of preference
+_GIFTER_NAME_ATTRS = ('unique_id', 'uniqueId', 'nickname', 'name')
+# Candidate attributes that exist on each user object type, in order of preference
+_GIFTER_ATTR_CACHE = {}
+
+
+def _gifter_name(gifter):
+    """
+    Get the gifter's username from a TikTokLive user object.
+    Which candidate attributes exist is resolved once per user type; the first one
+    with a value is still picked per gifter (e.g. an empty unique_id falls back to nickname).
+    
+    Args:
+        gifter: event.user from a GiftEvent (may be None)
+    
+    Returns:
+        str: The gifter's username, or '' if unknown
+    """
+    if gifter is None:
+        return ''
+    t = type(gifter)
+    attrs = _GIFTER_ATTR_CACHE.get(t)
+    if attrs is None:
+        attrs = _GIFTER_ATTR_CACHE[t] = tuple(a for a in _GIFTER_NAME_ATTRS if hasattr(gifter, a))
+    for attr in attrs:
+        name = getattr(gifter, attr, None)
+        if name:
+            return name
+    return ''
+
+
+class UserState:
+    """
+    Everything the monitoring service tracks for one TikTok user.
+    One object per username (instead of parallel per-user dicts/sets) means each event does a
+    single lookup; __slots__ drops the per-instance __dict__.
+    """
+    __slots__ = ('is_live', 'last_checked', 'connected_at', 'room_id', 'client', 'last_attempt',
+                 'notified', 'connected', 'connect_ts', 'end_sent', 'end_cooldown_ts', 'end_timer')
+
+    def __init__(self):
+        # Last known live status (stays True through short connection drops)
+        self.is_live = False
+        # When the status was last updated (ISO timestamp, informational only - set when DEBUG logging is on)
+        self.last_checked = None
+        # When the current TikTokLive connection was made (time.monotonic(), None while not connected)
+        self.connected_at = None
+        # TikTok's internal stream ID for the current connection
+        self.room_id = None
+        # Active TikTokLive client for this user (None if not connected)
+        self.client = None
+        # When we last tried to connect (time.monotonic(), avoids spam/retry loops)
+        self.last_attempt = 0
+        # We've sent a "go live" notification for this live session (prevents duplicates)
+        self.notified = False
+        # We've successfully connected (received ConnectEvent from TikTokLive)
+        self.connected = False
+        # When we successfully connected (time.monotonic(), for minimum duration check)
+        self.connect_ts = 0
+        # We've already sent an end notification (prevents duplicate end notifications)
+        self.end_sent = False
+        # When we last sent an end notification (time.monotonic(), cooldown to prevent spam)
+        self.end_cooldown_ts = 0
+        # Pending end notification (asyncio.TimerHandle) - cancelled if the user reconnects in time
+        self.end_timer = None
+
 
 class MonitoringService:
     """
@@ -22,18 +145,14 @@ class MonitoringService:
     Uses TikTokLive library to connect to TikTok's WebSocket API for real-time events.
     """
     def __init__(self):
-        # Background scheduler for periodic checks (runs check_users every 30 seconds)
-        self.scheduler = BackgroundScheduler()
+        # Periodic check task running on the event loop (runs check_users every CHECK_INTERVAL seconds)
+        self._check_task = None
+        # Strong references to fire-and-forget tasks (the event loop only keeps weak references)
+        self._background_tasks = set()
         # Flag indicating if monitoring service is currently running
         self._running = False
-        # Track last known status for each user (is_live, last_checked, etc.)
-        self.last_status = {}
-        # Track currently live users and their connection metadata
-        self.current_live_users = {}
-        # Track which user is the HOST (first to go live when multiple are live)
-        self.host_priority = None
-        # Track active TikTokLive client connections (username -> TikTokLiveClient)
-        self.live_clients = {}
+        # Per-user tracking state (username -> UserState)
+        self.users = {}
         # Async event loop for TikTokLive operations (runs in separate thread)
         self.loop = None
         # Thread that runs the async event loop
@@ -42,20 +161,29 @@ class MonitoringService:
         self._webhook_url = None
         # Store gift webhook URL (private - optional separate webhook for gifts)
         self._gift_webhook_url = None
-        # Track connection attempts with timestamps to avoid spam/retry loops
-        self.connection_attempts = {}
-        # Track users we've sent "go live" notifications for (prevents duplicate notifications)
-        self.notified_users = set()
-        # Track users we've successfully connected to (received ConnectEvent from TikTokLive)
-        self.successfully_connected = set()
-        # Track when we successfully connected to each user (for minimum duration check)
-        self.connection_start_times = {}
-        # Track pending end notifications with timestamps (grace period before sending)
-        self.pending_end_notifications = {}
-        # Track users we've already sent end notifications for (prevents duplicate end notifications)
-        self.end_notification_sent = set()
-        # Track when we last sent end notification for each user (cooldown to prevent spam)
-        self.end_notification_cooldown = {}
+        # DiscordWebhook for both URLs, reused for every notification (URLs are set in start())
+        # It owns the aiohttp session for Discord posts, so keep-alive connections persist across sends
+        self._webhook = DiscordWebhook()
+        # Outgoing Discord notifications and the worker task draining them (created on the event loop in start())
+        self._notify_q = None
+        self._notify_task = None
+        # Gifts waiting to be sent: (username, gift_name) -> [total repeat count, gifter usernames]
+        self._gift_buffer = {}
+        # Timer that flushes the gift buffer (None when nothing is buffered)
+        self._gift_flush_handle = None
+        # Limits concurrent TikTok probes/handshakes (created on the event loop in start())
+        self._connect_sem = None
+        # Users with a connect attempt in flight (prevents duplicate handshakes for the same user)
+        self._connecting = set()
+        # Per-user locks serializing the event handlers' state updates (username -> asyncio.Lock)
+        self._user_locks = {}
+        # Shared aiohttp session for TikTok live-status checks (created on the event loop in start())
+        self._http = None
+        # Parsed monitored users list and the file mtime it was read at (re-parsed only when the file changes)
+        self._users_cache = []
+        self._users_mtime_ns = -1
+        # (get_name, get_count) attrgetters for gift events, resolved from the first gift received
+        self._gift_accessors = None
 
     def start(self, webhook_url=None, gift_webhook_url=None):
         """
@@ -66,51 +194,215 @@ class MonitoringService:
             gift_webhook_url: Optional separate Discord webhook URL for gift notifications
         """
         if not self._running:
-            # Store webhook URL from parameter or environment variable
-            if webhook_url:
-                self._webhook_url = webhook_url
-                os.environ['DISCORD_WEBHOOK_URL'] = webhook_url  # Also store in environment
-            else:
-                # Fall back to environment variable if not provided
-                self._webhook_url = os.environ.get('DISCORD_WEBHOOK_URL', '')
+            # Store webhook URL from parameter, falling back to the environment variable once here
+            # Everything else reads the stored attribute, never os.environ
+            self._webhook_url = webhook_url or os.environ.get('DISCORD_WEBHOOK_URL', '')
             
             # Store gift webhook URL (optional - can be different channel)
-            if gift_webhook_url:
-                self._gift_webhook_url = gift_webhook_url
-                os.environ['DISCORD_GIFT_WEBHOOK_URL'] = gift_webhook_url
-            else:
-                # Fall back to environment variable if not provided
-                self._gift_webhook_url = os.environ.get('DISCORD_GIFT_WEBHOOK_URL', '')
+            self._gift_webhook_url = gift_webhook_url or os.environ.get('DISCORD_GIFT_WEBHOOK_URL', '')
+
+            # Point the shared webhook at this run's URLs (gifts use its gift_webhook_url when set)
+            self._webhook.set_urls(self._webhook_url, self._gift_webhook_url)
 
             # Print configuration status for debugging
-            print(f"🔧 Starting monitoring service...")
-            print(f"🔧 Webhook URL: {'✅ Configured' if self._webhook_url else '❌ NOT configured'}")
+            log.info("🔧 Starting monitoring service...")
+            log.info("🔧 Webhook URL: %s", '✅ Configured' if self._webhook_url else '❌ NOT configured')
             if self._webhook_url:
-                print(f"🔧 Webhook URL preview: {self._webhook_url[:50]}...")  # Show first 50 chars
-            print(f"🔧 Gift Webhook URL: {'✅ Configured' if self._gift_webhook_url else '❌ NOT configured (will use main webhook)'}")
+                log.info("🔧 Webhook URL preview: %s...", self._webhook_url[:50])  # Show first 50 chars
+            log.info("🔧 Event loop: %s", 'uvloop' if HAS_UVLOOP else 'asyncio')
+            log.info("🔧 Gift Webhook URL: %s", '✅ Configured' if self._gift_webhook_url else '❌ NOT configured (will use main webhook)')
             if self._gift_webhook_url:
-                print(f"🔧 Gift Webhook URL preview: {self._gift_webhook_url[:50]}...")
+                log.info("🔧 Gift Webhook URL preview: %s...", self._gift_webhook_url[:50])
 
             # Start async event loop in a separate thread
             # TikTokLive requires an async event loop, so we run it in a background thread
-            self.loop = asyncio.new_event_loop()
+            # uvloop's loop is created directly rather than through a global policy,
+            # so the Flask thread and any other asyncio users keep the default loop
+            self.loop = uvloop.new_event_loop() if HAS_UVLOOP else asyncio.new_event_loop()
+            # Python 3.12+: run new tasks eagerly up to their first await, so tasks that finish
+            # without suspending (skipped connects, early returns in handlers) never wait a loop turn
+            if sys.version_info >= (3, 12):
+                self.loop.set_task_factory(asyncio.eager_task_factory)
             # Daemon thread means it will exit when main program exits
             self.loop_thread = threading.Thread(target=self._run_event_loop, daemon=True)
             self.loop_thread.start()
 
-            # Schedule periodic user checks (runs every 30 seconds)
+            # Create the shared HTTP session on the event loop (aiohttp sessions belong to a loop)
+            # Wait for it so the first check_users run already has a session to use
+            asyncio.run_coroutine_threadsafe(self._init_session(), self.loop).result(timeout=10)
+
+            # Schedule periodic user checks (every CHECK_INTERVAL seconds) as a task on the event loop
             # This proactively tries to connect to users' live streams
-            self.scheduler.add_job(
-                func=self.check_users,  # Function to run periodically
-                trigger="interval",  # Run at regular intervals
-                seconds=30,  # Check every 30 seconds
-                id='check_users',  # Unique job ID
-                replace_existing=True  # Replace if job already exists
-            )
-            # Start the scheduler (begins running jobs)
-            self.scheduler.start()
+            asyncio.run_coroutine_threadsafe(self._start_periodic(), self.loop).result(timeout=10)
             self._running = True
-            print(f"✅ Monitoring service started")
+            log.info("✅ Monitoring service started")
+
+    async def _init_session(self):
+        """
+        Create the shared aiohttp session used for TikTok live-status checks.
+        Keep-alive connections (and the DNS cache) are reused across requests, so repeated
+        requests skip the TCP + TLS handshake.
+        """
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=60),
+            # Set User-Agent to mimic a browser (some sites block requests without it)
+            headers=_UA_HEADERS
+        )
+
+    async def _start_periodic(self):
+        """Start the periodic check task (must run on the event loop)"""
+        # Created here so the semaphore and queue belong to the monitoring loop
+        self._connect_sem = asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+        self._notify_q = asyncio.Queue(maxsize=NOTIFY_QUEUE_SIZE)
+        self._notify_task = asyncio.create_task(self._notify_worker())
+        self._check_task = asyncio.create_task(self._periodic(CHECK_INTERVAL, self.check_users))
+
+    async def _periodic(self, interval, fn):
+        """
+        Await fn() every `interval` seconds until cancelled (must run on the event loop).
+        Everything runs on the event loop thread, so no cross-thread hand-off is needed per run.
+        
+        Args:
+            interval: Seconds to sleep before each run
+            fn: Coroutine function to call
+        """
+        while True:
+            # Wait first, matching the previous interval-scheduler behaviour
+            await asyncio.sleep(interval)
+            try:
+                await fn()
+            except Exception as e:
+                # Keep the loop alive - one failed run shouldn't stop monitoring
+                log.exception("❌ Error in %s: %s", fn.__name__, e)
+
+    async def _notify_worker(self):
+        """
+        Send queued Discord notifications one at a time, rate-limited to ~5 per second.
+        Event handlers only enqueue, so a slow (or rate-limited) Discord never holds them up.
+        Each queue item is (embeds, mention_everyone, webhook_url, on_done).
+        """
+        while True:
+            embeds, mention_everyone, webhook_url, on_done = await self._notify_q.get()
+            try:
+                result = await self._webhook.send_many_async(
+                    embeds, mention_everyone=mention_everyone, webhook_url=webhook_url)
+            except Exception as e:
+                log.exception("❌ Error sending Discord notification: %s", e)
+                result = False
+            try:
+                if on_done:
+                    # Completion callback updates the user's state (runs on the loop, no awaits)
+                    on_done(result)
+            except Exception as e:
+                log.exception("❌ Error in notification callback: %s", e)
+            finally:
+                self._notify_q.task_done()
+            await asyncio.sleep(NOTIFY_INTERVAL)
+
+    def _queue_notification(self, embed, on_done=None):
+        """
+        Queue a live/end notification (with @everyone) for the notify worker.
+        Never waits: callers hold the user's lock, and parking on a full queue would stall
+        every other handler for that user. A full queue counts as a failed send.
+        
+        Args:
+            embed: Discord embed dictionary
+            on_done: Optional callback called with True/False once the send finished
+        """
+        try:
+            self._notify_q.put_nowait(([embed], True, None, on_done))
+        except asyncio.QueueFull:
+            log.warning("⚠️  Notification queue full, dropping notification")
+            # Let the caller's callback undo its state (e.g. clear notified so a later connect retries)
+            if on_done is not None:
+                on_done(False)
+
+    async def _drain_notifications(self):
+        """Queue any buffered gifts and wait until the notify worker has sent everything (used by stop())"""
+        self._flush_gifts()
+        await self._notify_q.join()
+
+    def _go_live_done(self, username, s, ok):
+        """
+        Completion callback for a queued go live notification.
+        
+        Args:
+            username: TikTok username the notification was for
+            s: That user's UserState
+            ok: True if the notification was sent
+        """
+        if ok:
+            log.info("✅ Go live notification sent for %s", username)
+        else:
+            log.error("❌ Failed to send go live notification for %s - check webhook URL", username)
+            # Not notified after all - allow another attempt on the next ConnectEvent / check
+            s.notified = False
+
+    def _end_live_done(self, username, s, connection_duration, ok):
+        """
+        Completion callback for a queued end live notification.
+        
+        Args:
+            username: TikTok username the notification was for
+            s: That user's UserState
+            connection_duration: How long the ended session was connected (seconds, for logging)
+            ok: True if the notification was sent
+        """
+        if ok:
+            log.info("✅ End live notification sent for %s (connection duration: %.1fs)", username, connection_duration)
+            # Mark that we sent the notification (unless a new live session already started meanwhile)
+            if not s.notified:
+                s.end_sent = True
+                s.end_cooldown_ts = time.monotonic()
+        else:
+            log.error("❌ Failed to send end live notification for %s", username)
+
+    def _state(self, username):
+        """
+        Get a user's tracking state, creating it on first sight.
+        Unlike setdefault(username, UserState()), this doesn't build a throwaway
+        UserState on every call for users that already have one.
+        """
+        s = self.users.get(username)
+        if s is None:
+            s = self.users[username] = UserState()
+        return s
+
+    def _lock_for(self, username):
+        """
+        Get the asyncio.Lock for a user (must be called on the event loop).
+        Holding it across an await keeps another handler for the same user from
+        interleaving and acting on stale state.
+        """
+        assert self._on_loop(), "_lock_for() called off the event loop"
+        lock = self._user_locks.get(username)
+        if lock is None:
+            lock = self._user_locks[username] = asyncio.Lock()
+        return lock
+
+    def _on_loop(self):
+        """
+        Check that the caller is running on the monitoring event loop.
+        Used as `assert self._on_loop()` in loop-only helpers: code on the loop should call
+        create_task/call_later directly, and only other threads (Flask, in start/stop) should
+        go through run_coroutine_threadsafe/call_soon_threadsafe.
+        """
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            # No running loop in this thread
+            return False
+
+    def _spawn(self, coro):
+        """
+        Run a coroutine as a fire-and-forget task on the event loop (must be called on the loop).
+        Keeps a strong reference until the task finishes so it can't be garbage collected early.
+        """
+        assert self._on_loop(), "_spawn() called off the event loop"
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
 
     def _run_event_loop(self):
         """
@@ -125,88 +417,353 @@ class MonitoringService:
     def stop(self):
         """Stop the monitoring service and clean up all connections"""
         if self._running:
+            # Stop periodic checks first so no new connections are started while shutting down
+            if self._check_task and self.loop:
+                self.loop.call_soon_threadsafe(self._check_task.cancel)
+                self._check_task = None
+
             # Disconnect all active TikTokLive clients
-            for username, client in list(self.live_clients.items()):
+            for state in list(self.users.values()):
+                # Drop pending end notifications (TimerHandle.cancel must run on the loop thread)
+                if state.end_timer is not None and self.loop:
+                    self.loop.call_soon_threadsafe(state.end_timer.cancel)
+                    state.end_timer = None
+                if state.client is None:
+                    continue
                 try:
                     # Disconnect asynchronously (from main thread to async thread)
-                    asyncio.run_coroutine_threadsafe(client.disconnect(), self.loop)
+                    asyncio.run_coroutine_threadsafe(state.client.disconnect(), self.loop)
                 except:
                     pass  # Ignore errors during cleanup
-            self.live_clients.clear()  # Clear the clients dictionary
+                state.client = None
+
+            # Send any queued notifications and buffered gifts before shutting down (needs the webhook session)
+            if self._notify_q and self.loop:
+                try:
+                    asyncio.run_coroutine_threadsafe(self._drain_notifications(), self.loop).result(timeout=15)
+                except Exception as e:
+                    log.error("Error sending pending notifications: %s", e)
+            if self._notify_task and self.loop:
+                self.loop.call_soon_threadsafe(self._notify_task.cancel)
+                self._notify_task = None
+
+            # Close the HTTP sessions on the event loop before stopping it
+            # (the webhook creates a new one on the next start's loop)
+            if self.loop:
+                try:
+                    asyncio.run_coroutine_threadsafe(self._webhook.close(), self.loop).result(timeout=5)
+                except Exception as e:
+                    log.warning("Error closing webhook HTTP session: %s", e)
+            if self._http and self.loop:
+                try:
+                    asyncio.run_coroutine_threadsafe(self._http.close(), self.loop).result(timeout=5)
+                except Exception as e:
+                    log.warning("Error closing HTTP session: %s", e)
+                self._http = None
 
             # Stop the async event loop
             if self.loop:
                 # Safely stop the loop from another thread
                 self.loop.call_soon_threadsafe(self.loop.stop)
 
-            # Shutdown the scheduler (stops periodic checks)
-            self.scheduler.shutdown()
             self._running = False
             
-            # Reset all tracking data structures
-            self.last_status = {}
-            self.current_live_users = {}
-            self.host_priority = None
-            self.notified_users.clear()
-            self.successfully_connected.clear()
-            self.connection_start_times.clear()
-            self.pending_end_notifications.clear()
-            self.end_notification_sent.clear()
-            self.end_notification_cooldown.clear()
-            print("Monitoring service stopped")
+            # Reset all tracking state
+            self.users = {}
+            self._connecting = set()
+            self._user_locks = {}
+            log.info("Monitoring service stopped")
 
     def is_running(self):
         """Check if monitoring service is currently running"""
         return self._running
 
     def load_users(self):
-        """Load monitored users from JSON file"""
-        users_file = 'monitored_users.json'
-        if os.path.exists(users_file):
-            with open(users_file, 'r') as f:
-                return json.load(f)  # Parse JSON and return list
-        return []  # Return empty list if file doesn't exist
+        """
+        Load monitored usernames from JSON file.
+        The parsed list is cached and only re-read when the file's mtime changes,
+        so the steady-state check tick costs a single stat().
+        
+        Returns:
+            list: Normalized usernames (stripped, no leading @, no blanks or duplicates)
+        """
+        try:
+            mtime_ns = os.stat(USERS_FILE).st_mtime_ns
+        except FileNotFoundError:
+            # Return empty list if file doesn't exist
+            self._users_cache = []
+            self._users_mtime_ns = -1
+            return []
+        if mtime_ns != self._users_mtime_ns:
+            with open(USERS_FILE, 'r') as f:
+                users = json.load(f)  # Parse JSON list
+            # Normalize once per file change instead of on every tick
+            names = (u.get('username', '').strip().lstrip('@') for u in users)
+            self._users_cache = list(dict.fromkeys(n for n in names if n))
+            self._users_mtime_ns = mtime_ns
+        return self._users_cache
 
-    def check_tiktok_user_live(self, username):
+    async def _check_live(self, username, timeout=5):
         """
         Check if a TikTok user is currently live (basic HTTP check).
         Note: This is a simple check - TikTokLive provides more accurate real-time status.
+        Runs on the event loop using the shared aiohttp session.
         
         Args:
             username: TikTok username to check
+            timeout: Total request timeout in seconds
         
         Returns:
-            True if user appears to be live, False otherwise
+            True if user appears to be live, False only if TikTok redirected away from the live page,
+            None if the result is unknown (error status or the check itself failed)
         """
         try:
             # Use TikTok's web interface to check live status
             # This is a simple HTTP check - for real-time events, we use TikTokLive
-            url = f"https://www.tiktok.com/@{username}/live"
-            # Set User-Agent to mimic a browser (some sites block requests without it)
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            # Make GET request (don't follow redirects - we want to see the status code)
-            response = requests.get(url, headers=headers, timeout=10, allow_redirects=False)
-
-            # If user is live, TikTok typically returns 200 or redirects
-            # This is a basic check - TikTokLive will provide more accurate real-time status
-            return response.status_code == 200
+            url = _LIVE_URL_TMPL.format(username)
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+            # Only the status code and Location header matter, so use HEAD instead of downloading the page
+            # Don't follow redirects - we want to see where TikTok sends us
+            async with self._http.head(url, allow_redirects=False, timeout=client_timeout) as response:
+                status = response.status
+                location = response.headers.get('Location', '')
+            if status == 405:
+                # HEAD not allowed - fall back to a GET for just the first byte of the page
+                async with self._http.get(url, allow_redirects=False, timeout=client_timeout,
+                                          headers=_RANGE_FIRST_BYTE) as response:
+                    status = response.status
+                    location = response.headers.get('Location', '')
+            # 200 (or 206 for the Range request) means the live page was served
+            if status in (200, 206):
+                return True
+            # A redirect that still points at a /live page means live; a redirect to the profile means offline
+            if 300 <= status < 400:
+                return '/live' in location
+            # Anything else (429 rate limit, 403 bot block, 5xx, ...) says nothing about the stream -
+            # report unknown so TikTokLive still gets to try
+            return None
         except Exception as e:
-            print(f"Error checking TikTok live status for {username}: {e}")
-            return False
+            log.warning("Error checking TikTok live status for %s: %s", username, e)
+            return None
+
+    def _buffer_gift(self, username, gift_name, repeat_count, gifter_username=''):
+        """
+        Add a gift to the flush buffer (must be called on the event loop).
+        The first gift of a batch schedules the flush GIFT_FLUSH_WINDOW seconds later.
+        
+        Args:
+            username: Streamer who received the gift
+            gift_name: Name of the gift
+            repeat_count: Number of gifts in this event
+            gifter_username: Optional username of the person who sent the gift
+        """
+        assert self._on_loop(), "_buffer_gift() called off the event loop"
+        entry = self._gift_buffer.get((username, gift_name))
+        if entry is None:
+            entry = self._gift_buffer[(username, gift_name)] = [0, set()]
+        entry[0] += repeat_count
+        if gifter_username:
+            entry[1].add(gifter_username)
+        if self._gift_flush_handle is None:
+            self._gift_flush_handle = self.loop.call_later(GIFT_FLUSH_WINDOW, self._flush_gifts)
+
+    def _take_gift_batch(self):
+        """
+        Swap out the buffered gifts and group them by streamer.
+        
+        Returns:
+            Dictionary of username -> list of gift embeds
+        """
+        if self._gift_flush_handle is not None:
+            self._gift_flush_handle.cancel()  # No-op when called from the timer itself
+            self._gift_flush_handle = None
+        buffer, self._gift_buffer = self._gift_buffer, {}
+        webhook = self._webhook
+        batch = {}
+        for (username, gift_name), (total, gifters) in buffer.items():
+            batch.setdefault(username, []).append(webhook.build_gift_embed(
+                username=username,
+                gift_type=gift_name,
+                gift_amount=total,
+                # Only name the gifter when a single person sent all of them
+                gifter_username=next(iter(gifters)) if len(gifters) == 1 else ''
+            ))
+        return batch
+
+    def _flush_gifts(self):
+        """
+        Timer callback: queue one webhook message per streamer with all of their buffered gifts.
+        Gift batches are dropped (with a warning) if the notification queue is full.
+        """
+        webhook = self._webhook
+        url = webhook.gift_webhook_url or webhook.webhook_url
+        for username, embeds in self._take_gift_batch().items():
+            try:
+                self._notify_q.put_nowait((embeds, False, url, partial(self._gifts_done, username, len(embeds))))
+            except asyncio.QueueFull:
+                log.warning("⚠️  Notification queue full, dropping %s gift notification(s) for %s", len(embeds), username)
+
+    def _gifts_done(self, username, gift_types, ok):
+        """Completion callback for a queued gift batch"""
+        if ok:
+            log.info("✅ Gift notifications sent for %s (%s gift type(s))", username, gift_types)
+        else:
+            log.error("❌ Failed to send gift notifications for %s", username)
+
+    def _probe_gift_accessors(self, event, username):
+        """
+        Work out where this TikTokLive version keeps the gift name and repeat count.
+        Runs on the first gift event; the resulting attrgetters are cached for later gifts.
+        
+        Args:
+            event: GiftEvent to inspect
+            username: Streamer the gift was sent to (for debug output)
+        
+        Returns:
+            (get_name, get_count) - attrgetter callables, or None where no attribute was found
+        """
+        # The gift is usually nested under event.gift, but may sit directly on the event
+        prefix = 'gift.' if hasattr(event, 'gift') else ''
+        gift = event.gift if prefix else event
+
+        def pick(candidates):
+            # Prefer the first attribute that has a value, else the first one that exists at all
+            present = [a for a in candidates if hasattr(gift, a)]
+            return next((a for a in present if getattr(gift, a)), present[0] if present else None)
+
+        name_attr = pick(_GIFT_NAME_ATTRS)
+        # The repeat count lives on the event itself in current TikTokLive versions (event.repeat_count),
+        # so look there first and only fall back to the gift object
+        count_attr = next((a for a in _GIFT_COUNT_ATTRS if hasattr(event, a)), None)
+        count_prefix = ''
+        if count_attr is None:
+            count_attr = pick(_GIFT_COUNT_ATTRS)
+            count_prefix = prefix
+        accessors = (attrgetter(prefix + name_attr) if name_attr else None,
+                     attrgetter(count_prefix + count_attr) if count_attr else None)
 
-    def connect_to_live_stream(self, username):
+        if name_attr is None:
+            # Couldn't find the name - log available attributes for debugging and probe again next time
+            gift_attrs = [attr for attr in dir(gift) if not attr.startswith('_')]
+            log.warning("⚠️  Could not extract gift name for %s. Available attributes: %s", username, gift_attrs[:10])
+            # Also try to print the gift object itself for debugging
+            try:
+                log.warning("   Gift object type: %s, Gift object: %s", type(gift), str(gift)[:200])
+            except:
+                pass
+        else:
+            self._gift_accessors = accessors
+        return accessors
+
+    def _end_timer_fired(self, username, connect_ts, connection_duration):
+        """
+        Called by the event loop when an end-notification grace period runs out.
+        
+        Args:
+            username: TikTok username whose stream ended
+            connect_ts: connect_ts of the session the timer was scheduled for
+            connection_duration: How long that session was connected (seconds, for logging)
+        """
+        self._spawn(self._send_end_notification(username, connect_ts, connection_duration))
+
+    async def _send_end_notification(self, username, connect_ts, connection_duration):
+        """
+        Send the end live notification once the grace period has passed without a reconnect.
+        
+        Args:
+            username: TikTok username whose stream ended
+            connect_ts: connect_ts of the session the timer was scheduled for
+            connection_duration: How long that session was connected (seconds, for logging)
+        """
+        try:
+            # Serialize with this user's connect/disconnect handlers
+            async with self._lock_for(username):
+                s = self.users.get(username)
+                # Timer was cancelled or the service was restarted meanwhile
+                if s is None or s.end_timer is None:
+                    return
+                s.end_timer = None
+
+                # Re-check the state - skip if they reconnected (new session) or we're connected again
+                if s.connected_at is not None or s.connect_ts != connect_ts:
+                    return
+
+                # All checks passed - queue the end notification (_end_live_done records the result)
+                self._queue_notification(
+                    self._webhook.build_end_live_embed(username=username, profile_image_url=""),
+                    partial(self._end_live_done, username, s, connection_duration)
+                )
+
+                # Clear the notified flag since stream has ended
+                # This allows us to send a new notification if they go live again
+                s.notified = False
+
+                # Only update status to not live if we actually sent the notification
+                s.is_live = False
+                s.last_checked = _debug_timestamp()
+
+                # No longer successfully connected since we've handled the disconnect
+                s.connected = False
+                s.connect_ts = 0
+        except Exception as e:
+            log.exception("❌ Error sending end notification for %s: %s", username, e)
+
+    async def _maybe_connect(self, username, now):
+        """
+        Proactively try to connect to TikTokLive for a user (called for every user each tick).
+        TikTokLive will fail gracefully if the user is not live.
+        Only attempts a connection if not already connected and not recently attempted.
+        
+        Args:
+            username: TikTok username to connect to
+            now: time.monotonic() reading for this tick
+        """
+        s = self.users[username]
+        # Wait 15 seconds between attempts
+        if s.client is not None or (s.last_attempt and now - s.last_attempt <= 15):
+            return
+
+        log.info("🔍 Attempting to connect to %s's live stream...", username)
+        s.last_attempt = now
+        await self.connect_to_live_stream(username)
+
+    async def connect_to_live_stream(self, username):
         """
         Connect to a user's live stream using TikTokLive to monitor real-time events.
-        Sets up event handlers for ConnectEvent, DisconnectEvent, and GiftEvent.
+        Skips users that are already connected or have a connect attempt in flight.
+        
+        Args:
+            username: TikTok username to connect to
+        """
+        # Skip if already connected, or if another connect for this user hasn't finished yet
+        state = self.users.get(username)
+        if username in self._connecting or (state and state.client is not None):
+            return
+
+        self._connecting.add(username)
+        try:
+            await self._connect(username)
+        finally:
+            # By now the client is stored on the user's state (or the attempt was abandoned)
+            self._connecting.discard(username)
+
+    async def _connect(self, username):
+        """
+        Probe the user's live page, then set up a TikTokLive client with handlers for
+        ConnectEvent, DisconnectEvent, and GiftEvent (called via connect_to_live_stream).
+        The probe means offline users don't cost a TikTokLive connection attempt.
         
         Args:
             username: TikTok username to connect to
         """
-        # Skip if already connected to this user
-        if username in self.live_clients:
-            return  # Already connected
+        # Cheap HEAD probe first - only skip when TikTok clearly says the user is offline
+        # (if the probe fails or gets an error status, fall through and let TikTokLive decide)
+        # The semaphore caps how many probes/handshakes hit TikTok at once
+        async with self._connect_sem:
+            is_live = await self._check_live(username)
+        if is_live is False:
+            log.info("ℹ️  %s is not live, skipping TikTokLive connection", username)
+            return
 
         try:
             # Create TikTokLive client for this username
@@ -223,87 +780,81 @@ class MonitoringService:
                 This fires when the user goes live or when we connect to an active stream.
                 """
                 try:
-                    print(f"✅ Successfully connected to {username}'s live stream!")
-                    connection_time = datetime.now().isoformat()
+                    log.info("✅ Successfully connected to %s's live stream!", username)
+                    # Informational last_checked value (None unless DEBUG logging is on)
+                    connection_time = _debug_timestamp()
                     # Extract room_id from event if available (TikTok's internal stream ID)
                     room_id = None
                     if event and hasattr(event, 'room_id'):
                         room_id = event.room_id
 
-                    # Mark that we successfully connected to this user
-                    # This is important for preventing false "end live" notifications
-                    self.successfully_connected.add(username)
-                    # Track connection start time for minimum duration check
-                    # Prevents false notifications from very short connection issues
-                    self.connection_start_times[username] = time.time()
-                    
-                    self.current_live_users[username] = {
-                        'connected_at': connection_time,
-                        'room_id': room_id
-                    }
-                    # Reset connection attempt counter on success
-                    if username in self.connection_attempts:
-                        del self.connection_attempts[username]
-
-                    # Check if user just went live
-                    last_status = self.last_status.get(username, {})
-                    was_live = last_status.get('is_live', False)
-
-                    # CRITICAL: Only send notification if we haven't already sent one for this live session
-                    # Check notified_users FIRST to prevent ANY duplicate notifications
-                    # This prevents sending multiple "go live" notifications for the same stream
-                    if username in self.notified_users:
-                        # Already sent notification for this live session - NEVER send again
-                        print(f"🚫 {username} already has notification sent for this live session, skipping duplicate (ConnectEvent)")
-                        # Still update status but don't send notification
-                        self.last_status[username] = {
-                            'is_live': True,
-                            'last_checked': connection_time,
-                            'connected_at': connection_time
-                        }
-                        return  # Exit early, don't process further
-                    
-                    # Only send notification if user wasn't previously live
-                    if not was_live:
-                        # User just went live - determine if HOST
-                        currently_live_count = len([u for u, s in self.last_status.items() if s.get('is_live', False)])
-                        is_host = currently_live_count == 0  # First to go live is HOST
-
-                        # Get webhook URL (capture it in closure)
-                        webhook_url = self._webhook_url or os.environ.get('DISCORD_WEBHOOK_URL', '')
-                        print(f"🔔 Sending go live notification for {username} (webhook: {'✅' if webhook_url else '❌'})")
-
-                        webhook = DiscordWebhook(webhook_url=webhook_url)
-                        result = webhook.send_go_live_notification(
-                            username=username,
-                            viewer_count=0,  # Will be updated if available
-                            stream_url=f"https://www.tiktok.com/@{username}/live",
-                            is_host=is_host
-                        )
-                        if result:
-                            print(f"✅ Go live notification sent for {username}")
-                            # Mark that we've sent a notification for this user in this live session
-                            self.notified_users.add(username)
+                    # Handlers for the same user run one at a time, so state can't change under us
+                    async with self._lock_for(username):
+                        # One lookup for all of this user's tracking state
+                        s = self._state(username)
+
+                        # Reconnected within the grace period - the stream didn't end, cancel the end notification
+                        if s.end_timer is not None:
+                            s.end_timer.cancel()
+                            s.end_timer = None
+                            log.info("ℹ️  %s reconnected, cancelled pending end notification", username)
+
+                        # Mark that we successfully connected to this user
+                        # This is important for preventing false "end live" notifications
+                        s.connected = True
+                        # Track connection start time for minimum duration check
+                        # Prevents false notifications from very short connection issues
+                        s.connect_ts = time.monotonic()
+
+                        s.connected_at = time.monotonic()
+                        s.room_id = room_id
+                        # Reset connection attempt timer on success
+                        s.last_attempt = 0
+
+                        # Check if user just went live
+                        was_live = s.is_live
+
+                        # CRITICAL: Only send notification if we haven't already sent one for this live session
+                        # Check the notified flag FIRST to prevent ANY duplicate notifications
+                        # This prevents sending multiple "go live" notifications for the same stream
+                        if s.notified:
+                            # Already sent notification for this live session - NEVER send again
+                            log.info("🚫 %s already has notification sent for this live session, skipping duplicate (ConnectEvent)", username)
+                            # Still update status but don't send notification
+                            s.is_live = True
+                            s.last_checked = connection_time
+                            return  # Exit early, don't process further
+
+                        # Only send notification if user wasn't previously live
+                        if not was_live:
+                            # User just went live - determine if HOST
+                            # First to go live is HOST (any() stops at the first live user instead of counting all)
+                            is_host = not any(state.is_live for state in self.users.values())
+
+                            webhook = self._webhook
+                            log.info("🔔 Queueing go live notification for %s (webhook: %s)", username, '✅' if webhook.webhook_url else '❌')
+
+                            # Mark that we've notified for this live session right away, so nothing queues a duplicate
+                            # meanwhile (_go_live_done clears it again if the send fails)
+                            s.notified = True
                             # Clear any previous end notification tracking (user is live again)
-                            self.end_notification_sent.discard(username)
-                            if username in self.end_notification_cooldown:
-                                del self.end_notification_cooldown[username]
+                            s.end_sent = False
+                            s.end_cooldown_ts = 0
+                            self._queue_notification(webhook.build_go_live_embed(
+                                username=username,
+                                viewer_count=0,  # Will be updated if available
+                                stream_url=_LIVE_URL_TMPL.format(username),
+                                is_host=is_host
+                            ), partial(self._go_live_done, username, s))
                         else:
-                            print(f"❌ Failed to send go live notification for {username} - check webhook URL")
-                    elif was_live:
-                        # User was already live - this is a reconnection, don't send notification
-                        print(f"ℹ️  {username} was already live (reconnection detected), skipping notification")
-
-                    # Always update status to reflect current live state
-                    self.last_status[username] = {
-                        'is_live': True,
-                        'last_checked': connection_time,
-                        'connected_at': connection_time
-                    }
+                            # User was already live - this is a reconnection, don't send notification
+                            log.info("ℹ️  %s was already live (reconnection detected), skipping notification", username)
+
+                        # Always update status to reflect current live state
+                        s.is_live = True
+                        s.last_checked = connection_time
                 except Exception as e:
-                    print(f"❌ Error in on_connect handler for {username}: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    log.exception("❌ Error in on_connect handler for %s: %s", username, e)
 
             @client.on(DisconnectEvent)
             async def on_disconnect(event: DisconnectEvent):
@@ -312,138 +863,85 @@ class MonitoringService:
                 This can happen when the stream ends, connection fails, or user goes offline.
                 """
                 try:
-                    print(f"Disconnected from {username}'s live stream")
-                    # Remove from current live users tracking
-                    if username in self.current_live_users:
-                        del self.current_live_users[username]
-
-                    # CRITICAL: Only send "end live" notification if ALL conditions are met:
-                    # This prevents false "end live" notifications from connection issues
-                    # 1. We successfully connected (received ConnectEvent)
-                    # 2. We actually sent a "go live" notification
-                    # 3. The user was marked as live
-                    # 4. Connection lasted at least 30 seconds (prevents false notifications from connection issues)
-                    # 5. We haven't already sent an end notification for this user
-                    # 6. It's been at least 60 seconds since last end notification (cooldown)
-                    # 7. We verify the user is actually not live anymore (double-check)
+                    log.info("Disconnected from %s's live stream", username)
+                    # Handlers for the same user run one at a time, so state can't change under us
+                    async with self._lock_for(username):
+                        s = self._state(username)
+                        # No longer connected to the stream
+                        s.connected_at = None
+                        s.room_id = None
+
+                        # CRITICAL: Only send "end live" notification if ALL conditions are met:
+                        # This prevents false "end live" notifications from connection issues
+                        # 1. We successfully connected (received ConnectEvent)
+                        # 2. We actually sent a "go live" notification
+                        # 3. The user was marked as live
+                        # 4. Connection lasted at least 30 seconds (prevents false notifications from connection issues)
+                        # 5. We haven't already sent an end notification for this user
+                        # 6. It's been at least 60 seconds since last end notification (cooldown)
+                        # 7. The user doesn't reconnect within the grace period (debounced timer)
                     
-                    if username in self.successfully_connected and username in self.notified_users:
-                        last_status = self.last_status.get(username, {})
-                        
-                        # Check if we already sent an end notification
-                        if username in self.end_notification_sent:
-                            print(f"ℹ️  End notification already sent for {username}, skipping duplicate")
-                            # Clean up but don't send again
-                            self.successfully_connected.discard(username)
-                            if username in self.connection_start_times:
-                                del self.connection_start_times[username]
-                            return
-                        
-                        # Check cooldown
-                        last_end_time = self.end_notification_cooldown.get(username, 0)
-                        time_since_last = time.time() - last_end_time if last_end_time > 0 else 999
-                        if time_since_last < 60:
-                            print(f"ℹ️  End notification cooldown active for {username} ({60 - int(time_since_last)}s remaining), skipping")
-                            return
+                        if s.connected and s.notified:
+                            # Check if we already sent an end notification
+                            if s.end_sent:
+                                log.info("ℹ️  End notification already sent for %s, skipping duplicate", username)
+                                # Clean up but don't send again
+                                s.connected = False
+                                s.connect_ts = 0
+                                return
                         
-                        # Double-check: only send if we actually marked them as live
-                        if last_status.get('is_live', False):
-                            # Check connection duration - if less than 30 seconds, likely a connection issue
-                            connection_start = self.connection_start_times.get(username, 0)
-                            connection_duration = time.time() - connection_start if connection_start > 0 else 0
-                            
-                            if connection_duration < 30:
-                                # Connection was too short - likely a connection issue, don't send end notification
-                                print(f"⚠️  Disconnected from {username} after only {connection_duration:.1f}s - likely connection issue, skipping end notification")
-                                # Clean up but don't send notification
-                                self.successfully_connected.discard(username)
-                                if username in self.connection_start_times:
-                                    del self.connection_start_times[username]
-                                # Don't update status - keep as live to avoid false "ended" detection
+                            # Check cooldown
+                            last_end_time = s.end_cooldown_ts
+                            time_since_last = time.monotonic() - last_end_time if last_end_time > 0 else 999
+                            if time_since_last < 60:
+                                log.info("ℹ️  End notification cooldown active for %s (%ss remaining), skipping", username, 60 - int(time_since_last))
                                 return
+                        
+                            # Double-check: only send if we actually marked them as live
+                            if s.is_live:
+                                # Check connection duration - if less than 30 seconds, likely a connection issue
+                                connection_start = s.connect_ts
+                                connection_duration = time.monotonic() - connection_start if connection_start > 0 else 0
                             
-                            # Verify user is actually not live anymore before sending notification
-                            # Wait a moment and check if they're still live
-                            await asyncio.sleep(5)  # Wait 5 seconds
-                            
-                            # Check if user is still live by trying to access their live page
-                            # Use asyncio to run the blocking request in a thread
-                            try:
-                                check_url = f"https://www.tiktok.com/@{username}/live"
-                                # Run the blocking request in a thread pool
-                                # Note: run_in_executor doesn't support kwargs directly, so we need to create a wrapper function
-                                def check_user_live_status(url):
-                                    """Helper function to check if user is still live"""
-                                    return requests.get(url, timeout=5, allow_redirects=False)
-                                
-                                loop = asyncio.get_event_loop()
-                                check_response = await loop.run_in_executor(
-                                    None,
-                                    check_user_live_status,
-                                    check_url
-                                )
-                                # If we get a 200, they might still be live (or page exists)
-                                # If we get a redirect or error, they're likely not live
-                                if check_response.status_code == 200:
-                                    # User might still be live - don't send end notification
-                                    print(f"⚠️  User {username} may still be live (status code: {check_response.status_code}), skipping end notification")
-                                    # Don't clean up - they might reconnect
+                                if connection_duration < 30:
+                                    # Connection was too short - likely a connection issue, don't send end notification
+                                    log.warning("⚠️  Disconnected from %s after only %.1fs - likely connection issue, skipping end notification", username, connection_duration)
+                                    # Clean up but don't send notification
+                                    s.connected = False
+                                    s.connect_ts = 0
+                                    # Don't update status - keep as live to avoid false "ended" detection
                                     return
-                            except Exception as check_error:
-                                # If check fails, assume they're not live (safer to not send than send false)
-                                print(f"⚠️  Could not verify live status for {username}: {check_error}, skipping end notification to avoid false positive")
-                                return
-                            
-                            # All checks passed - send end notification
-                            webhook_url = self._webhook_url or os.environ.get('DISCORD_WEBHOOK_URL', '')
-                            webhook = DiscordWebhook(webhook_url=webhook_url)
-                            result = webhook.send_end_live_notification(
-                                username=username,
-                                profile_image_url=""
-                            )
-                            if result:
-                                print(f"✅ End live notification sent for {username} (connection duration: {connection_duration:.1f}s)")
-                                # Mark that we sent the notification
-                                self.end_notification_sent.add(username)
-                                self.end_notification_cooldown[username] = time.time()
-                            else:
-                                print(f"❌ Failed to send end live notification for {username}")
-
-                            # Remove from notified users since stream has ended
-                            # This allows us to send a new notification if they go live again
-                            self.notified_users.discard(username)
                             
-                            # Only update status to not live if we actually sent the notification
-                            self.last_status[username] = {
-                                'is_live': False,
-                                'last_checked': datetime.now().isoformat()
-                            }
+                                # Don't send yet - wait out a grace period first. If the user is still live,
+                                # the next check_users tick reconnects and on_connect cancels the timer
+                                if s.end_timer is None:
+                                    s.end_timer = self.loop.call_later(
+                                        END_NOTIFICATION_GRACE, self._end_timer_fired, username, s.connect_ts, connection_duration)
+                                    log.info("⏳ End notification for %s scheduled in %ss (cancelled if they reconnect)", username, END_NOTIFICATION_GRACE)
+                                # Drop the client so the next check tick can reconnect if they're still live
+                                s.client = None
+                                return
                         
-                        # Remove from successfully connected since we've handled the disconnect
-                        self.successfully_connected.discard(username)
-                        if username in self.connection_start_times:
-                            del self.connection_start_times[username]
-                    else:
-                        # Connection failed before we could successfully connect or send a notification
-                        if username not in self.successfully_connected:
-                            print(f"ℹ️  Disconnected from {username} before successful connection (connection likely failed)")
+                            # No longer successfully connected since we've handled the disconnect
+                            s.connected = False
+                            s.connect_ts = 0
                         else:
-                            print(f"ℹ️  Disconnected from {username} but no notification was sent (skipping end notification)")
+                            # Connection failed before we could successfully connect or send a notification
+                            if not s.connected:
+                                log.info("ℹ️  Disconnected from %s before successful connection (connection likely failed)", username)
+                            else:
+                                log.info("ℹ️  Disconnected from %s but no notification was sent (skipping end notification)", username)
                         
-                        # Clean up connection tracking
-                        self.successfully_connected.discard(username)
-                        if username in self.connection_start_times:
-                            del self.connection_start_times[username]
-                        # Don't update last_status to is_live=False if we never notified
-                        # This prevents check_users from thinking the stream ended
-
-                    # Remove from clients if still there
-                    if username in self.live_clients:
-                        del self.live_clients[username]
+                            # Clean up connection tracking
+                            s.connected = False
+                            s.connect_ts = 0
+                            # Don't update is_live to False if we never notified
+                            # This prevents check_users from thinking the stream ended
+
+                        # Drop the client if still there
+                        s.client = None
                 except Exception as e:
-                    print(f"❌ Error in on_disconnect handler for {username}: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    log.exception("❌ Error in on_disconnect handler for %s: %s", username, e)
 
             @client.on(GiftEvent)
             async def on_gift(event: GiftEvent):
@@ -452,108 +950,39 @@ class MonitoringService:
                 This provides real-time gift notifications from TikTok's WebSocket.
                 """
                 try:
-                    # Default values in case event data is missing
-                    gift_name = 'Gift'
-                    repeat_count = 1
-                    gifter_username = ''
-
-                    # Extract gift information from event - try multiple possible attribute names
-                    # First try to get gift object from event
-                    gift = None
-                    if event and hasattr(event, 'gift'):
-                        gift = event.gift
-                    elif event:
-                        # Sometimes gift info might be directly on the event
-                        gift = event
-                    
-                    if gift:
-                        # Try multiple possible attribute names for gift name
-                        # TikTokLive may use different attribute names in different versions
-                        gift_name = (
-                            getattr(gift, 'name', None) or  # Most common: gift.name
-                            getattr(gift, 'gift_name', None) or  # Alternative: gift.gift_name
-                            getattr(gift, 'giftName', None) or  # CamelCase variant
-                            getattr(gift, 'giftId', None) or  # Sometimes only ID is available
-                            getattr(gift, 'gift_id', None) or  # Snake_case variant
-                            None
-                        )
-                        
-                        # If we still don't have a name, try accessing as dictionary (some libraries use dict-like access)
-                        if not gift_name and hasattr(gift, '__dict__'):
-                            gift_dict = gift.__dict__
-                            gift_name = (
-                                gift_dict.get('name') or
-                                gift_dict.get('gift_name') or
-                                gift_dict.get('giftName') or
-                                None
-                            )
-                        
-                        # Final fallback
-                        if not gift_name:
-                            gift_name = 'Gift'
-                        
-                        # If we only got an ID, try to get a more descriptive name
-                        if gift_name and (str(gift_name).isdigit() or 'id' in str(gift_name).lower()):
-                            # If it's just an ID, try to get the actual name
-                            actual_name = getattr(gift, 'name', None) or getattr(gift, 'gift_name', None)
-                            if actual_name:
-                                gift_name = actual_name
-                        
-                        # Extract repeat count (number of gifts sent in this batch)
-                        repeat_count = (
-                            getattr(gift, 'repeat_count', None) or
-                            getattr(gift, 'repeatCount', None) or
-                            getattr(gift, 'count', None) or
-                            getattr(gift, 'amount', None) or
-                            (gift.__dict__.get('repeat_count') if hasattr(gift, '__dict__') else None) or
-                            (gift.__dict__.get('count') if hasattr(gift, '__dict__') else None) or
-                            1  # Default to 1 if not found
-                        )
-                        
-                        # Debug: Print available gift attributes to help troubleshoot
-                        if gift_name == 'Gift':
-                            # If we couldn't find the name, log available attributes for debugging
-                            gift_attrs = [attr for attr in dir(gift) if not attr.startswith('_')]
-                            print(f"⚠️  Could not extract gift name for {username}. Available attributes: {gift_attrs[:10]}")
-                            # Also try to print the gift object itself for debugging
-                            try:
-                                print(f"   Gift object type: {type(gift)}, Gift object: {str(gift)[:200]}")
-                            except:
-                                pass
+                    # Streakable gifts send one event per streak update, each with the running total;
+                    # only the final (non-streaking) event carries the full count, so skip the rest
+                    # instead of summing every update
+                    if getattr(event, 'streaking', False):
+                        return
 
+                    # Resolve the gift name / repeat count accessors once, then reuse them for every gift
+                    # (a single C-level attrgetter call instead of a getattr cascade per event)
+                    get_name, get_count = self._gift_accessors or self._probe_gift_accessors(event, username)
+                    try:
+                        gift_name = get_name(event) if get_name else None
+                        repeat_count = get_count(event) if get_count else None
+                    except AttributeError:
+                        # This event is shaped differently from the one we probed - probe again
+                        get_name, get_count = self._probe_gift_accessors(event, username)
+                        gift_name = get_name(event) if get_name else None
+                        repeat_count = get_count(event) if get_count else None
+                    # Default values in case event data is missing
+                    gift_name = gift_name or 'Gift'
+                    # Number of gifts sent in this batch
+                    repeat_count = repeat_count or 1
                     # Extract gifter (person who sent the gift) information
-                    if event and hasattr(event, 'user'):
-                        gifter = event.user
-                        # Try multiple possible attribute names for username
-                        gifter_username = (
-                            getattr(gifter, 'unique_id', None) or
-                            getattr(gifter, 'uniqueId', None) or
-                            getattr(gifter, 'nickname', None) or
-                            getattr(gifter, 'name', None) or
-                            ''
-                        ) if gifter else ''
-
-                    print(f"🎁 {username} received gift: {gift_name} x{repeat_count}" + (f" from @{gifter_username}" if gifter_username else ""))
+                    gifter_username = _gifter_name(getattr(event, 'user', None))
+
+                    log.debug("🎁 %s received gift: %s x%s%s", username, gift_name, repeat_count,
+                              gifter_username and ' from @' + gifter_username)
                     
-                    # Get webhook URLs (use stored or environment variables)
-                    webhook_url = self._webhook_url or os.environ.get('DISCORD_WEBHOOK_URL', '')
-                    gift_webhook_url = self._gift_webhook_url or os.environ.get('DISCORD_GIFT_WEBHOOK_URL', '')
-                    # Create webhook instance and send gift notification
-                    webhook = DiscordWebhook(webhook_url=webhook_url, gift_webhook_url=gift_webhook_url)
-                    result = webhook.send_gift_notification(
-                        username=username,
-                        gift_type=gift_name,
-                        gift_amount=repeat_count,
-                        gifter_username=gifter_username
-                    )
-                    if result:
-                        print(f"✅ Gift notification sent for {username}: {gift_name} x{repeat_count}")
-                    else:
-                        print(f"❌ Failed to send gift notification for {username}")
+                    # Buffer the gift - the same gift for the same user within the flush window
+                    # is summed up, and each user's gifts go out together in one webhook message
+                    self._buffer_gift(username, gift_name, repeat_count, gifter_username)
+                    log.debug("📨 Gift notification queued for %s: %s x%s", username, gift_name, repeat_count)
                 except Exception as e:
-                    print(f"❌ Error in on_gift handler for {username}: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    log.exception("❌ Error in on_gift handler for %s: %s", username, e)
 
             # Note: TikTokLive may not have separate LiveEvent/LiveEndEvent
             # The ConnectEvent fires when user goes live, DisconnectEvent when they end
@@ -561,263 +990,116 @@ class MonitoringService:
             # Connect to the live stream asynchronously
             # TikTokLive uses async operations, so we need to run it in the async event loop
             if self.loop and self.loop.is_running():
-                print(f"🔗 Starting TikTokLive connection for {username}...")
+                log.info("🔗 Starting TikTokLive connection for %s...", username)
                 try:
                     # Create a wrapper function to handle connection errors gracefully
                     async def start_connection():
                         try:
                             # Start the TikTokLive client (connects to WebSocket)
-                            await client.start()
+                            # Shares the probe semaphore so handshakes are bounded too
+                            async with self._connect_sem:
+                                await client.start()
                         except Exception as e:
-                            print(f"❌ TikTokLive connection failed for {username}: {e}")
-                            # Remove from clients if connection failed
-                            if username in self.live_clients:
-                                del self.live_clients[username]
-                            # Clean up connection tracking - connection never succeeded
-                            self.successfully_connected.discard(username)
-                            if username in self.connection_start_times:
-                                del self.connection_start_times[username]
-                            # Also remove from connection attempts so we can retry
-                            if username in self.connection_attempts:
-                                # Reset after a delay to allow retry
-                                pass
-
-                    # Run the async connection function in the event loop thread
-                    # run_coroutine_threadsafe allows calling async code from sync code
-                    future = asyncio.run_coroutine_threadsafe(start_connection(), self.loop)
+                            log.error("❌ TikTokLive connection failed for %s: %s", username, e)
+                            s = self.users.get(username)
+                            if s:
+                                # Drop the client - connection never succeeded
+                                # (last_attempt is kept so the retry waits out the usual delay)
+                                s.client = None
+                                # Clean up connection tracking, unless an end notification is pending:
+                                # a failed reconnect during the grace period is the stream really ending,
+                                # and the timer needs the previous session's connect_ts to send it
+                                if s.end_timer is None:
+                                    s.connected = False
+                                    s.connect_ts = 0
+
+                    # Run the async connection function as a task on the event loop
+                    # (check_users already runs on the loop thread, so no thread-safe hand-off is needed)
+                    self._spawn(start_connection())
                     # Store the client so we can disconnect it later
-                    self.live_clients[username] = client
+                    self._state(username).client = client
                     # Note: Connection happens in background, errors are handled in start_connection
                 except Exception as e:
-                    print(f"❌ Error setting up connection for {username}: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    log.exception("❌ Error setting up connection for %s: %s", username, e)
             else:
-                print(f"❌ Event loop not running, cannot connect to {username}")
+                log.error("❌ Event loop not running, cannot connect to %s", username)
 
         except Exception as e:
-            print(f"❌ Error setting up connection for {username}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("❌ Error setting up connection for %s: %s", username, e)
 
-    def check_users(self):
+    async def check_users(self):
         """
-        Periodic check function (runs every 30 seconds via scheduler).
+        Periodic check coroutine (runs every CHECK_INTERVAL seconds on the event loop via _periodic).
         Checks all monitored users and proactively tries to connect to their live streams.
-        This is a fallback mechanism - most notifications come from TikTokLive event handlers.
+        All notifications come from the TikTokLive event handlers; this only keeps the
+        connections and status in sync.
         """
         # Load the list of users to monitor from JSON file
         users = self.load_users()
 
-        # Use stored webhook URL or get from environment
-        # This ensures we have a webhook URL even if it was set after service started
-        if not self._webhook_url:
-            self._webhook_url = os.environ.get('DISCORD_WEBHOOK_URL', '')
-
         # Validate that webhook URL is configured
         if not self._webhook_url:
-            print("⚠️ Warning: Discord webhook URL not configured")
+            log.warning("⚠️ Warning: Discord webhook URL not configured")
             return
 
         # Skip if no users to monitor
         if not users:
             return
 
-        currently_live = {}
-        new_live_users = []
-        ended_live_users = []
+        # One clock read for the whole tick's back-off checks
+        now = time.monotonic()
+        # One last_checked timestamp shared by every user updated this tick (None unless DEBUG logging)
+        now_iso = _debug_timestamp()
 
         # Check each user
-        for user_data in users:
-            username = user_data.get('username', '').strip()
-            if not username:
-                continue
-
-            # Remove @ if present
-            if username.startswith('@'):
-                username = username[1:]
-
-            last_status = self.last_status.get(username, {})
-            was_live = last_status.get('is_live', False)
+        for username in users:
+            # One lookup for all of this user's tracking state
+            s = self._state(username)
+            was_live = s.is_live
 
             # Check if user is live based on TikTokLive connection status
-            is_live = username in self.current_live_users
-
-            # Proactively try to connect to TikTokLive for all users
-            # TikTokLive will fail gracefully if user is not live
-            # Only attempt connection if not already connected and not recently attempted
-            last_attempt = self.connection_attempts.get(username, 0)
-            time_since_attempt = time.time() - last_attempt if last_attempt else 999
-
-            if username not in self.live_clients and time_since_attempt > 15:  # Wait 15 seconds between attempts
-                print(f"🔍 Attempting to connect to {username}'s live stream...")
-                self.connection_attempts[username] = time.time()
-                self.connect_to_live_stream(username)
-            elif not is_live and username in self.live_clients:
+            is_live = s.connected_at is not None
+
+            if not is_live and s.client is not None:
                 # User was connected but is no longer live - disconnect
-                print(f"🔌 Disconnecting from {username} (no longer live)")
+                log.info("🔌 Disconnecting from %s (no longer live)", username)
                 try:
-                    client = self.live_clients[username]
-                    asyncio.run_coroutine_threadsafe(client.disconnect(), self.loop)
-                    del self.live_clients[username]
+                    self._spawn(s.client.disconnect())
+                    s.client = None
                 except Exception as e:
-                    print(f"Error disconnecting from {username}: {e}")
+                    log.warning("Error disconnecting from %s: %s", username, e)
 
             if is_live:
-                currently_live[username] = {
-                    'connected_at': self.current_live_users.get(username, {}).get('connected_at',
-                                                                                  datetime.now().isoformat())
-                }
-
-                # User just went live (detected via TikTokLive connection)
-                # Only add to new_live_users if:
-                # 1. They weren't previously live, AND
-                # 2. We haven't already sent a notification for this live session
-                if not was_live and username not in self.notified_users:
-                    new_live_users.append({
-                        'username': username,
-                        'connected_at': currently_live[username]['connected_at']
-                    })
-                    print(f"🟢 {username} is now LIVE!")
-                elif was_live and username in self.notified_users:
-                    # User is already live and we've already notified - skip
-                    print(f"ℹ️  {username} is already live and already notified, skipping duplicate detection")
-                elif not was_live and username in self.notified_users:
-                    # Edge case: user wasn't live but is in notified_users (shouldn't happen, but clean up)
-                    print(f"⚠️  {username} was in notified_users but wasn't live - cleaning up")
-                    self.notified_users.discard(username)
-                    new_live_users.append({
-                        'username': username,
-                        'connected_at': currently_live[username]['connected_at']
-                    })
-                    print(f"🟢 {username} is now LIVE! (after cleanup)")
-                
-                # Always update last status to reflect they are live
-                self.last_status[username] = {
-                    'is_live': True,
-                    'last_checked': datetime.now().isoformat()
-                }
+                # Go-live notifications are sent by the ConnectEvent handler, which also marks them live
+                s.is_live = True
+                s.last_checked = now_iso
             else:
                 # User is not currently live
-                # Only mark as "ended" if:
-                # 1. We previously marked them as live
-                # 2. We successfully connected (not just a failed attempt)
-                # 3. We actually sent a notification
-                # 4. They're not in live_clients (disconnect already handled)
+                # End notifications ONLY come from the DisconnectEvent handler (it has proper
+                # verification and cooldown mechanisms) - polling can have false positives
                 if (was_live and 
-                    username in self.successfully_connected and 
-                    username in self.notified_users and
-                    username not in self.live_clients):
-                    # Check connection duration before marking as ended
-                    connection_start = self.connection_start_times.get(username, 0)
-                    connection_duration = time.time() - connection_start if connection_start > 0 else 0
-                    
-                    if connection_duration >= 10:
-                        # Connection was long enough - this might be a real end
-                        ended_live_users.append({
-                            'username': username
-                        })
-                        print(f"🔴 {username} ended their stream (detected via polling, duration: {connection_duration:.1f}s)")
-                    else:
-                        # Connection was too short - likely a false positive, don't mark as ended
-                        print(f"⚠️  {username} appears ended but connection was too short ({connection_duration:.1f}s) - ignoring")
-                        # Don't update status - keep as live to avoid false notifications
-                elif was_live and username not in self.notified_users:
+                    s.connected and 
+                    s.notified and
+                    s.client is None):
+                    # Disconnected and waiting on the end notification grace period - keep as live
+                    log.debug("ℹ️  %s appears ended, leaving the end notification to DisconnectEvent", username)
+                elif was_live and not s.notified:
                     # User was marked as live but we never sent a notification
                     # This was likely a failed connection, just reset the status
-                    print(f"ℹ️  {username} was marked live but never notified - resetting status")
-                    self.last_status[username] = {
-                        'is_live': False,
-                        'last_checked': datetime.now().isoformat()
-                    }
+                    log.info("ℹ️  %s was marked live but never notified - resetting status", username)
+                    s.is_live = False
+                    s.last_checked = now_iso
                     # Clean up tracking
-                    self.successfully_connected.discard(username)
-                    if username in self.connection_start_times:
-                        del self.connection_start_times[username]
+                    s.connected = False
+                    s.connect_ts = 0
                 else:
                     # User is not live and wasn't live before - no change
-                    self.last_status[username] = {
-                        'is_live': False,
-                        'last_checked': datetime.now().isoformat()
-                    }
-
-        # Determine HOST: the user with the earliest connection time among all currently live users
-        if currently_live:
-            # Find the HOST (earliest connection)
-            host_username = None
-            earliest_connection = None
-
-            for username, data in currently_live.items():
-                connection_time = data.get('connected_at', '')
-                if earliest_connection is None or connection_time < earliest_connection:
-                    earliest_connection = connection_time
-                    host_username = username
-
-            self.host_priority = host_username
-        else:
-            self.host_priority = None
-
-        # Handle HOST priority: if multiple users are live, only notify for the HOST
-        # Filter new_live_users to only include the HOST if multiple users are live
-        users_to_notify = []
-
-        if len(currently_live) > 1:
-            # Multiple users live - only notify if the new user is the HOST
-            for user_data in new_live_users:
-                if user_data['username'] == self.host_priority:
-                    users_to_notify.append(user_data)
-                    print(f"Multiple users live - notifying only for HOST: {user_data['username']}")
-        else:
-            # Only one user live (or none) - notify normally
-            users_to_notify = new_live_users
-
-        # Send notifications for new live streams (only HOST if multiple)
-        # Note: Most notifications are handled by TikTokLive event handlers above
-        # This section handles cases where we detect live status via polling
-        webhook = DiscordWebhook(webhook_url=self._webhook_url or os.environ.get('DISCORD_WEBHOOK_URL', ''))
-
-        for user_data in users_to_notify:
-            username = user_data['username']
-            is_host = (self.host_priority == username and len(currently_live) > 1)
-
-            # CRITICAL: Only send notification if we haven't already sent one for this live session
-            # This is the final check to prevent ANY duplicate notifications
-            if username in self.notified_users:
-                # Already sent notification for this live session - NEVER send again
-                print(f"🚫 {username} already has notification sent for this live session, skipping duplicate (already in notified_users)")
-                continue  # Skip to next user
-            
-            # Only send notification if we haven't already sent via TikTokLive connection
-            if username not in self.live_clients:
-                result = webhook.send_go_live_notification(
-                    username=username,
-                    viewer_count=0,
-                    stream_url=f"https://www.tiktok.com/@{username}/live",
-                    is_host=is_host
-                )
-                if result:
-                    print(f"✅ Go live notification sent for {username}")
-                    # Mark that we've sent a notification for this user in this live session
-                    # This prevents ANY future notifications until stream ends
-                    self.notified_users.add(username)
-                else:
-                    print(f"❌ Failed to send go live notification for {username}")
-            else:
-                # User is in live_clients, notification should have been sent by ConnectEvent handler
-                print(f"ℹ️  {username} is in live_clients, notification should be handled by ConnectEvent")
-
-        # DISABLED: Polling-based end notifications are completely disabled
-        # End notifications should ONLY come from DisconnectEvent handler
-        # Polling can have false positives and should not trigger end notifications
-        # This prevents false "end live" notifications from polling detection
-        # The DisconnectEvent handler has proper verification and cooldown mechanisms
-        for user_data in ended_live_users:
-            username = user_data['username']
-            # Do NOT send end notifications from polling - only log for debugging
-            if username in self.notified_users:
-                print(f"ℹ️  Polling detected {username} as ended, but end notifications are disabled from polling (only DisconnectEvent sends them)")
-                # Don't send notification - let DisconnectEvent handle it if it's real
-
-        # Update current live users
-        self.current_live_users = currently_live
+                    s.is_live = False
+                    s.last_checked = now_iso
+
+        # Probe and connect to all candidates at once - the tick takes as long as the slowest
+        # probe instead of the sum of all of them (errors are handled inside connect_to_live_stream)
+        # This sweep is how go-live is detected: TikTokLive only delivers events once connected
+        # to a live room, so an offline user has no client that could tell us they went live
+        await asyncio.gather(*[self._maybe_connect(u, now) for u in users], return_exceptions=True)
 